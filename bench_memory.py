@@ -0,0 +1,93 @@
+"""Benchmark mémoire des fiches joueurs : dicts d'origine vs PlayerRecord compact.
+
+Usage : python bench_memory.py [--players 100000] [--seed 42]
+
+Génère des joueurs synthétiques reproductibles (compteurs, dates, achievements, rivalités),
+mesure avec tracemalloc les octets retenus par joueur dans chaque représentation et vérifie
+que PlayerRecord.to_json() redonne exactement le format JSON d'origine.
+"""
+import argparse
+import gc
+import random
+import tracemalloc
+from datetime import datetime, timedelta
+
+from main import ACHIEVEMENTS, PlayerRecord, name_table, rivalries
+
+
+def make_rivals(rnd, names):
+    # Rivalités symétriques, comme les écrivait record_rivalry : kills de A sur B = morts de B contre A
+    rivals = {n: {} for n in names}
+    for a in names:
+        for _ in range(rnd.choice((0, 0, 1, 1, 2, 3, 4, 8))):
+            b = rnd.choice(names)
+            if b == a or b in rivals[a]:
+                continue
+            k, d = rnd.randrange(6), rnd.randrange(6)
+            rivals[a][b] = {"kills": k, "deaths": d}
+            rivals[b][a] = {"kills": d, "deaths": k}
+    return rivals
+
+
+def make_player(rnd, rivals):
+    # Même forme que l'ancien init_player, remplie comme après quelques semaines de jeu
+    first = datetime(2024, 1, 1) + timedelta(seconds=rnd.randrange(90 * 86400))
+    last  = first + timedelta(seconds=rnd.randrange(30 * 86400))
+    return {
+        "total_minutes": rnd.randrange(20000), "sessions": rnd.randrange(400),
+        "kills": rnd.randrange(300), "deaths": rnd.randrange(300),
+        "zombie_kills": rnd.randrange(150), "clan_kills": rnd.randrange(20),
+        "last_seen": last.isoformat(),
+        "first_seen": first.isoformat(),
+        "achievements": [a for a in ACHIEVEMENTS if rnd.random() < 0.2],
+        "rivals": rivals,
+    }
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    data = build()
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used, data
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--players", type=int, default=100_000)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    # Pseudos créés hors mesure : ils existent dans les deux représentations
+    names = [name_table.intern(f"Player{i}") for i in range(args.players)]
+
+    def legacy():
+        rnd = random.Random(args.seed)
+        rivals = make_rivals(rnd, names)
+        return {n: make_player(rnd, rivals[n]) for n in names}
+
+    def compact():
+        # Les fiches et le graphe `rivalries` qu'elles remplissent sont mesurés ensemble
+        rnd = random.Random(args.seed)
+        rivals = make_rivals(rnd, names)
+        players = {}
+        for n in names:
+            players[n] = PlayerRecord.from_json(n, make_player(rnd, rivals.pop(n)))
+        rivalries.rebuild()
+        return players
+
+    old_bytes, old = measure(legacy)
+    new_bytes, new = measure(compact)
+    assert all(new[n].to_json() == old[n] for n in names), "to_json() ne redonne pas le format d'origine !"
+
+    print(f"{'représentation':<16} {'total (Mo)':>11} {'octets/joueur':>14}")
+    for label, b in (("dicts d'origine", old_bytes), ("PlayerRecord", new_bytes)):
+        print(f"{label:<16} {b / 1e6:>11.1f} {b / args.players:>14,.0f}")
+    print(f"gain x{old_bytes / new_bytes:.1f} ({args.players} joueurs, JSON identique)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Benchmark du parser de logs : ancien moteur (5 re.search par ligne) vs moteur actuel.
+
+Usage : python bench_parser.py [--lines 1000000] [--seed 42]
+
+Génère un corpus synthétique reproductible (Vanilla et Forge), vérifie que les deux
+moteurs produisent la même liste d'événements (hors horodatage : l'ancien moteur
+renvoyait toujours "00:00:00") et affiche les lignes/s.
+"""
+import argparse
+import random
+import re
+import time
+
+from main import parse_minecraft_logs
+
+
+def legacy_parse_minecraft_logs(log_content):
+    # Copie conforme de l'implémentation d'origine, gardée comme référence
+    events = []
+    TIME_PAT = r"(?:\[\d{2}:\d{2}:\d{2}\]|\[\d{1,2}\w+\d{4}\s+\d{2}:\d{2}:\d{2}\.\d+\])"
+    patterns = {
+        "join":         TIME_PAT + r".*?(\w+)\s+joined the game",
+        "leave":        TIME_PAT + r".*?(\w+)\s+left the game",
+        "zombie_death": TIME_PAT + r".*?(\w+)\s+was (?:slain|killed) by (?:Zombie|zombie)",
+        "pvp_kill":     TIME_PAT + r".*?(\w+)\s+was (?:slain|killed) by (\w+)",
+        "fall_death":   TIME_PAT + r".*?(\w+)\s+(?:fell from a high place|fell off|died|hit the ground too hard|drowned|burned to death|starved to death)",
+    }
+    MOBS = {"Zombie","Skeleton","Creeper","Spider","Witch","Enderman","Blaze","Ghast",
+            "Slime","Phantom","Drowned","Husk","Stray","Pillager","Ravager","Wither",
+            "Ender_Dragon","Vindicator","Evoker","Guardian","Shulker","Silverfish"}
+    for line in log_content.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        for etype, pat in patterns.items():
+            m = re.search(pat, line)
+            if m:
+                g = m.groups()
+                if etype == "pvp_kill":
+                    if g[1] not in MOBS:
+                        events.append({"type": etype, "time": "00:00:00", "victim": g[0], "killer": g[1]})
+                else:
+                    events.append({"type": etype, "time": "00:00:00", "player": g[0]})
+                break
+    return events
+
+
+PLAYERS = [f"Player{i}" for i in range(40)] + ["Steve", "Alex", "Notch", "xX_Sniper_Xx"]
+NOISE = [
+    "[Server thread/INFO]: Saving chunks for level 'ServerLevel[world]'/minecraft:overworld",
+    "[Server thread/WARN]: Can't keep up! Is the server overloaded? Running 2043ms or 40 ticks behind",
+    "[Server thread/INFO]: ThreadedAnvilChunkStorage (world): All chunks are saved",
+    "[User Authenticator #1/INFO]: UUID of player {p} is 069a79f4-44e9-4726-a5be-fca90e38aaf5",
+    "[Server thread/INFO]: {p}[/10.0.0.{n}:5{n}12] logged in with entity id {n} at (12.5, 64.0, -3.2)",
+    "[Server thread/INFO]: <{p}> gg tout le monde, qui a killed le dragon ?",
+    "[Server thread/INFO]: <{p}> j'ai failli tomber, I almost fell lol",
+    "[modloading-worker-0/INFO]: Loading mod ironchest version 14.4.4",
+    "[Server thread/INFO]: Preparing spawn area: {n}%",
+    "[Server thread/INFO]: {p} has made the advancement [Stone Age]",
+    "[Server thread/INFO]: {p} lost connection: Disconnected",
+]
+EVENTS = [
+    "[Server thread/INFO]: {p} joined the game",
+    "[Server thread/INFO]: {p} left the game",
+    "[Server thread/INFO]: {p} was slain by Zombie",
+    "[Server thread/INFO]: {p} was slain by {q}",
+    "[Server thread/INFO]: {p} was killed by {q} using [Netherite Sword]",
+    "[Server thread/INFO]: {p} was slain by Skeleton",
+    "[Server thread/INFO]: {p} fell from a high place",
+    "[Server thread/INFO]: {p} drowned",
+    "[Server thread/INFO]: {p} burned to death",
+    "[Server thread/INFO]: {p} died",
+]
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+def make_corpus(n_lines, fmt, seed):
+    rnd = random.Random(seed)
+    out = []
+    for i in range(n_lines):
+        h, m, s = rnd.randrange(24), rnd.randrange(60), rnd.randrange(60)
+        if fmt == "vanilla":
+            ts = f"[{h:02d}:{m:02d}:{s:02d}]"
+        else:
+            ts = f"[{rnd.randrange(1, 29)}{rnd.choice(MONTHS)}2024 {h:02d}:{m:02d}:{s:02d}.{rnd.randrange(1000):03d}]"
+        tpl = rnd.choice(EVENTS) if rnd.random() < 0.05 else rnd.choice(NOISE)
+        out.append(ts + " " + tpl.format(p=rnd.choice(PLAYERS), q=rnd.choice(PLAYERS), n=rnd.randrange(100)))
+    return "\n".join(out)
+
+
+def bench(fn, text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        res = fn(text)
+        best = min(best, time.perf_counter() - t0)
+    return best, res
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lines", type=int, default=1_000_000)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--repeat", type=int, default=1)
+    args = ap.parse_args()
+
+    print(f"{'corpus':<8} {'moteur':<8} {'temps (s)':>10} {'lignes/s':>12} {'événements':>11}")
+    for fmt in ("vanilla", "forge"):
+        text = make_corpus(args.lines, fmt, args.seed)
+        t_old, ev_old = bench(legacy_parse_minecraft_logs, text, args.repeat)
+        t_new, ev_new = bench(parse_minecraft_logs, text, args.repeat)
+        untimed = [{**e, "time": "00:00:00"} for e in ev_new]
+        assert ev_old == untimed, f"{fmt} : résultats différents !"
+        for name, t in (("ancien", t_old), ("actuel", t_new)):
+            print(f"{fmt:<8} {name:<8} {t:>10.2f} {args.lines / t:>12,.0f} {len(ev_new):>11}")
+        print(f"{fmt:<8} speedup  x{t_old / t_new:.1f} (événements identiques)")
+
+
+if __name__ == "__main__":
+    main()
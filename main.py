@@ -1,18 +1,40 @@
 import discord
+import aiohttp
+from discord import app_commands
 from discord.ext import commands, tasks
 from dotenv import load_dotenv
 import os
 from mcstatus import JavaServer
-from datetime import datetime
+from datetime import datetime, date, timedelta, time as dt_time
+from bisect import bisect_left, bisect_right, insort
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import json
 import re
+import math
+import hashlib
+import gzip
+import zlib
+import codecs
+import collections
+import heapq
+import itertools
+import copy
+import signal
+import sys
+import sqlite3
+import pickle
+import tempfile
+import threading
+import time
+import asyncio
 
 load_dotenv()
 
 BOT_TOKEN  = os.getenv("BOT_TOKEN")
 OWNER_ID   = 715572086898294907
 SERVER_ADDRESS = "lmanagil.aternos.me"
-SERVER_DISPLAY_NAME = "Serveur Minecraft"  # ← Nom affiché dans /status
+SERVER_DISPLAY_NAME = "Serveur Minecraft"  # ← Serveur par défaut du registre (/addserver pour en ajouter)
 
 # ══════════════════════════════════════════════
 #  CONFIG (modifiable avec /setconfig)
@@ -27,12 +49,46 @@ CONFIG = {
     "POINTS_PER_HOUR":         1,
     "MAX_CLAN_NAME_LENGTH":    20,
     "MAX_BOUNTY_POINTS":       1000,
+    "JOURNAL_MAX_KB":          2048,
+    "SAVE_INTERVAL_SECONDS":   5,
+    "UPLOAD_PROGRESS_MB":      10,
+    "PARSE_WORKERS":           0,   # 0 = nombre de cœurs
+    "PARSE_SHARD_MB":          4,
+    "MERGE_BATCH_EVENTS":      1000,  # fusion multi-fichiers : événements appliqués entre deux passages de la boucle
+    "TAIL_LOG_PATH":           "",  # fichier ou dossier logs/ local à suivre en continu ("" = désactivé)
+    "TAIL_POLL_MIN_SECONDS":   2,
+    "TAIL_POLL_MAX_SECONDS":   60,
+    "TAIL_BATCH_KB":           256,
+    "LEDGER_CAPACITY":         500000,  # empreintes de lignes mémorisées par génération
+    "PLAYTIME_SOURCE":         "monitor",  # "monitor" (sondage du serveur) ou "logs" (sessions exactes join/leave)
+    "DNS_CACHE_SECONDS":       600,  # durée de vie de la résolution SRV/DNS du serveur
+    "STATUS_CACHE_SECONDS":    15,   # un statut plus récent est réutilisé par /status et le moniteur
+    "PROBE_TIMEOUT_SECONDS":   5,    # délai maximal d'une sonde complète (résolution + status + query)
+    "QUERY_RECHECK_MINUTES":   30,   # port query indisponible : nouvel essai après ce délai
+    "PROBE_CONCURRENCY":       8,    # sondes de serveurs simultanées au maximum
+    "MONITOR_MIN_SECONDS":     30,   # intervalle de sondage serveur en ligne / changement d'état
+    "MONITOR_MAX_SECONDS":     600,  # plafond du recul exponentiel quand le serveur dort
+    "RENDER_CACHE_SIZE":       256,  # embeds gardés en cache (LRU)
+    "PAGE_CACHE_SECONDS":      60,   # durée de vie d'une page de classement rendue
+    "ROLE_SYNC_MINUTES":       15,   # réconciliation du rôle actif
+    "ROLE_SYNC_PER_SECOND":    1.0,  # appels API max par seconde pendant la réconciliation
 }
 
-DATA_DIR  = "./data"
-DATA_FILE = "./data/server_data.json"
+DATA_DIR     = "./data"
+DATA_FILE    = "./data/server_data.json"
+JOURNAL_FILE = "./data/server_data.journal"
+JOURNAL_OLD  = "./data/server_data.journal.old"
+DB_FILE      = "./data/server_data.db"
+LEDGER_FILE  = "./data/ingest_ledger.bin"
 os.makedirs(DATA_DIR, exist_ok=True)
 
+# "journal" : chaque modification est ajoutée au journal, snapshot compacté en arrière-plan
+# "json"    : ancien mode, le fichier complet est réécrit à chaque sauvegarde
+# "sqlite"  : tables indexées dans server_data.db (migration auto depuis le JSON au 1er démarrage)
+STORAGE_MODE = os.getenv("STORAGE_MODE", "journal")
+if STORAGE_MODE not in ("journal", "json", "sqlite"):
+    raise SystemExit(f"STORAGE_MODE inconnu : {STORAGE_MODE!r} (journal, json ou sqlite)")
+
 PREFIX = "!"
 intents = discord.Intents.default()
 intents.message_content = True
@@ -41,14 +97,13 @@ intents.members = True
 bot  = commands.Bot(command_prefix=PREFIX, intents=intents, help_command=None)
 tree = bot.tree
 
-previous_status      = None
-mc_server            = None
 player_data          = {}
 clans                = {}
 clan_members         = {}
 missions             = {}
 achievements_data    = {}
-current_session_players = {}
+ingest_state         = {}   # état de l'ingestion des logs (offset du tail, etc.)
+servers              = {}   # registre des serveurs surveillés : clé → {address, name, announce_channel, logs_channel}
 
 # ══════════════════════════════════════════════
 #  SYSTÈME DE BOUNTY (PRIMES)
@@ -59,171 +114,1869 @@ bounties = {}
 #  SAUVEGARDE / CHARGEMENT
 # ══════════════════════════════════════════════
 
+# Entrées modifiées depuis la dernière sauvegarde : {(collection, clé)}
+_dirty = set()
+_DELETED = object()
+_save_requested = False
+_flush_lock = asyncio.Lock()
+_compaction_thread = None
+
+def _collections():
+    return {
+        "players":      player_data,
+        "clans":        clans,
+        "clan_members": clan_members,
+        "missions":     missions,
+        "achievements": achievements_data,
+        "bounties":     bounties,
+        "ingest":       ingest_state,
+        "servers":      servers,
+        "config":       CONFIG,
+    }
+
+def mark_dirty(coll, *keys):
+    """Signale qu'une ou plusieurs entrées d'une collection ont changé (ou ont été supprimées)."""
+    _versions[coll] += 1
+    for k in keys:
+        _dirty.add((coll, k))
+        _versions[(coll, k)] += 1
+    if coll in _RANKED:
+        _rank_stale.update((coll, k) for k in keys)
+    elif coll in _REVERSE:
+        idx, src = _REVERSE[coll], _collections()[coll]
+        for k in keys:
+            idx.update(k, src.get(k))
+
+def _write_atomic(path, data):
+    # Fichier temporaire + fsync + rename : un crash ne laisse jamais un fichier tronqué
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def _read_snapshot():
+    try:
+        with open(DATA_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _replay_journal(data, path):
+    """Applique les enregistrements d'un journal sur `data`. Retourne le nombre appliqué."""
+    applied = 0
+    try:
+        f = open(path, 'r', encoding='utf-8')
+    except FileNotFoundError:
+        return 0
+    with f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # dernière ligne incomplète après un crash
+            coll = data.setdefault(rec["c"], {})
+            if rec.get("d"):
+                coll.pop(rec["k"], None)
+            else:
+                coll[rec["k"]] = rec["v"]
+            applied += 1
+    return applied
+
+def _compact_journal():
+    # Tourne dans un thread : ne lit que le disque (snapshot + journal archivé), jamais la mémoire du bot
+    try:
+        data = _read_snapshot() or {}
+        n = _replay_journal(data, JOURNAL_OLD)
+        _write_atomic(DATA_FILE, data)
+        os.remove(JOURNAL_OLD)
+        print(f"[Data] Journal compacté ({n} enregistrements)")
+    except Exception as e:
+        print(f"[Erreur] Compaction : {e}")
+
+def _maybe_compact():
+    global _compaction_thread
+    if _compaction_thread and _compaction_thread.is_alive():
+        return
+    if os.path.exists(JOURNAL_OLD):
+        return
+    if os.path.getsize(JOURNAL_FILE) < CONFIG["JOURNAL_MAX_KB"] * 1024:
+        return
+    os.replace(JOURNAL_FILE, JOURNAL_OLD)  # les nouvelles écritures repartent sur un journal vide
+    _compaction_thread = threading.Thread(target=_compact_journal, name="journal-compaction", daemon=True)
+    _compaction_thread.start()
+
+# ── Backend SQLite ──────────────────────────────
+
+_PLAYER_COLS = ("total_minutes", "sessions", "kills", "deaths", "zombie_kills", "clan_kills", "last_seen", "first_seen")
+_CLAN_COLS   = ("leader", "created", "points")
+_BOUNTY_COLS = ("proposer_clan", "proposed_by", "points", "created")
+
+_DB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    name TEXT PRIMARY KEY, total_minutes REAL NOT NULL DEFAULT 0, sessions INTEGER NOT NULL DEFAULT 0,
+    kills INTEGER NOT NULL DEFAULT 0, deaths INTEGER NOT NULL DEFAULT 0,
+    zombie_kills INTEGER NOT NULL DEFAULT 0, clan_kills INTEGER NOT NULL DEFAULT 0,
+    last_seen TEXT, first_seen TEXT, extra TEXT
+);
+CREATE TABLE IF NOT EXISTS rivals (
+    player TEXT NOT NULL, opponent TEXT NOT NULL,
+    kills INTEGER NOT NULL DEFAULT 0, deaths INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (player, opponent)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS player_achievements (
+    player TEXT NOT NULL, ach_id TEXT NOT NULL, pos INTEGER NOT NULL,
+    PRIMARY KEY (player, ach_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS clans (
+    name TEXT PRIMARY KEY, leader TEXT, created TEXT, points INTEGER NOT NULL DEFAULT 0, extra TEXT
+);
+CREATE TABLE IF NOT EXISTS clan_members (player TEXT PRIMARY KEY, clan TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS bounties (
+    target TEXT PRIMARY KEY, proposer_clan TEXT, proposed_by TEXT, points INTEGER, created TEXT
+);
+CREATE TABLE IF NOT EXISTS kv (coll TEXT NOT NULL, key TEXT NOT NULL, value TEXT, PRIMARY KEY (coll, key)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_players_minutes   ON players(total_minutes DESC);
+CREATE INDEX IF NOT EXISTS idx_players_kills     ON players(kills DESC);
+CREATE INDEX IF NOT EXISTS idx_rivals_opponent   ON rivals(opponent);
+CREATE INDEX IF NOT EXISTS idx_clans_points      ON clans(points DESC);
+CREATE INDEX IF NOT EXISTS idx_clan_members_clan ON clan_members(clan);
+CREATE INDEX IF NOT EXISTS idx_bounties_clan     ON bounties(proposer_clan);
+"""
+
+_db = None
+
+def _db_conn():
+    global _db
+    if _db is None:
+        # Les écritures passent par le thread de persistence_flusher, sérialisées par _flush_lock
+        _db = sqlite3.connect(DB_FILE, check_same_thread=False)
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.execute("PRAGMA synchronous=NORMAL")
+        _db.executescript(_DB_SCHEMA)
+    return _db
+
+def _db_put(cur, coll, key, val):
+    if coll == "players":
+        cur.execute("DELETE FROM rivals WHERE player=?", (key,))
+        cur.execute("DELETE FROM player_achievements WHERE player=?", (key,))
+        if val is _DELETED:
+            cur.execute("DELETE FROM players WHERE name=?", (key,)); return
+        extra = {k: v for k, v in val.items() if k not in _PLAYER_COLS and k not in ("rivals", "achievements")}
+        cur.execute("INSERT OR REPLACE INTO players VALUES (?,?,?,?,?,?,?,?,?,?)",
+                    (key, *[val.get(c, 0 if c not in ("last_seen", "first_seen") else None) for c in _PLAYER_COLS],
+                     json.dumps(extra, ensure_ascii=False) if extra else None))
+        cur.executemany("INSERT INTO rivals VALUES (?,?,?,?)",
+                        [(key, o, r.get("kills", 0), r.get("deaths", 0)) for o, r in val.get("rivals", {}).items()])
+        cur.executemany("INSERT OR IGNORE INTO player_achievements VALUES (?,?,?)",
+                        [(key, a, i) for i, a in enumerate(val.get("achievements", []))])
+    elif coll == "clans":
+        if val is _DELETED:
+            cur.execute("DELETE FROM clans WHERE name=?", (key,)); return
+        extra = {k: v for k, v in val.items() if k not in _CLAN_COLS}
+        cur.execute("INSERT OR REPLACE INTO clans VALUES (?,?,?,?,?)",
+                    (key, *[val.get(c) for c in _CLAN_COLS], json.dumps(extra, ensure_ascii=False) if extra else None))
+    elif coll == "clan_members":
+        if val is _DELETED:
+            cur.execute("DELETE FROM clan_members WHERE player=?", (key,)); return
+        cur.execute("INSERT OR REPLACE INTO clan_members VALUES (?,?)", (key, val))
+    elif coll == "bounties":
+        if val is _DELETED:
+            cur.execute("DELETE FROM bounties WHERE target=?", (key,)); return
+        cur.execute("INSERT OR REPLACE INTO bounties VALUES (?,?,?,?,?)", (key, *[val.get(c) for c in _BOUNTY_COLS]))
+    else:
+        if val is _DELETED:
+            cur.execute("DELETE FROM kv WHERE coll=? AND key=?", (coll, key)); return
+        cur.execute("INSERT OR REPLACE INTO kv VALUES (?,?,?)", (coll, key, json.dumps(val, ensure_ascii=False)))
+
+def _db_apply(records):
+    conn = _db_conn()
+    with conn:  # une transaction par flush
+        cur = conn.cursor()
+        for coll, key, val in records:
+            _db_put(cur, coll, key, val)
+
+def _db_load():
+    """Reconstruit l'état en mémoire depuis SQLite. Retourne None si la base est vide."""
+    conn = _db_conn()
+    if conn.execute("SELECT 1 FROM players UNION ALL SELECT 1 FROM clans UNION ALL SELECT 1 FROM kv LIMIT 1").fetchone() is None:
+        return None
+    data = {"players": {}, "clans": {}, "clan_members": {}, "bounties": {}}
+    players = data["players"]
+    for row in conn.execute("SELECT name, %s, extra FROM players" % ", ".join(_PLAYER_COLS)):
+        d = dict(zip(_PLAYER_COLS, row[1:-1]))
+        d["achievements"] = []
+        d["rivals"] = {}
+        if row[-1]:
+            d.update(json.loads(row[-1]))
+        players[row[0]] = d
+    for p, o, k, dth in conn.execute("SELECT player, opponent, kills, deaths FROM rivals"):
+        if p in players:
+            players[p]["rivals"][o] = {"kills": k, "deaths": dth}
+    for p, a in conn.execute("SELECT player, ach_id FROM player_achievements ORDER BY player, pos"):
+        if p in players:
+            players[p]["achievements"].append(a)
+    for row in conn.execute("SELECT name, %s, extra FROM clans" % ", ".join(_CLAN_COLS)):
+        d = dict(zip(_CLAN_COLS, row[1:-1]))
+        if row[-1]:
+            d.update(json.loads(row[-1]))
+        data["clans"][row[0]] = d
+    data["clan_members"] = dict(conn.execute("SELECT player, clan FROM clan_members"))
+    for row in conn.execute("SELECT target, %s FROM bounties" % ", ".join(_BOUNTY_COLS)):
+        data["bounties"][row[0]] = dict(zip(_BOUNTY_COLS, row[1:]))
+    for coll, key, value in conn.execute("SELECT coll, key, value FROM kv"):
+        data.setdefault(coll, {})[key] = json.loads(value)
+    return data
+
+def migrate_json_to_sqlite():
+    """Import unique de server_data.json (+ journal) vers SQLite. Retourne les données importées ou None."""
+    data, _ = _read_json_state()
+    if data is None:
+        return None
+    records = [(coll, key, val) for coll, entries in data.items() if isinstance(entries, dict)
+               for key, val in entries.items()]
+    _db_apply(records)
+    print(f"[Data] Migration JSON → SQLite : {len(records)} entrées importées")
+    return data
+
+# ── Lectures SQL (mode sqlite) ──────────────────
+# /stats, /rivalry, /claninfo et les classements lisent la base par clé primaire ou par les index
+# ci-dessus. Connexion séparée, réservée à la boucle asyncio : en WAL elle lit le dernier état validé
+# sans gêner le thread d'écriture. db_sync() est appelé avant, la base ayant jusqu'à un flush de retard.
+
+_db_ro = None
+
+def _db_reader():
+    global _db_ro
+    if _db_ro is None:
+        _db_conn()  # crée le schéma si besoin
+        _db_ro = sqlite3.connect(DB_FILE)
+    return _db_ro
+
+async def db_sync():
+    """Mode sqlite : écrit les modifications en attente pour que la lecture SQL qui suit soit à jour."""
+    if STORAGE_MODE != "sqlite":
+        return
+    achievement_engine.commit()
+    if _dirty:
+        await flush_data()
+
+def db_player(name):
+    """Fiche d'un joueur au format JSON (sans les rivalités), ou None."""
+    conn = _db_reader()
+    row  = conn.execute("SELECT %s, extra FROM players WHERE name=?" % ", ".join(_PLAYER_COLS), (name,)).fetchone()
+    if row is None:
+        return None
+    d = dict(zip(_PLAYER_COLS, row[:-1]))
+    if row[-1]:
+        d.update(json.loads(row[-1]))
+    d["achievements"] = [a for (a,) in conn.execute(
+        "SELECT ach_id FROM player_achievements WHERE player=? ORDER BY pos", (name,))]
+    return d
+
+def db_top_rivals(name, col, n=3):
+    """[(adversaire, nombre)] : les n plus grosses valeurs de `col` ("kills" ou "deaths") du joueur."""
+    return _db_reader().execute(
+        "SELECT opponent, %s FROM rivals WHERE player=? AND %s > 0 ORDER BY %s DESC, opponent LIMIT ?" % (col, col, col),
+        (name, n)).fetchall()
+
+def db_stats(name):
+    """(fiche, clan, prime sur le joueur, top victimes, top tueurs), ou None."""
+    d = db_player(name)
+    if d is None:
+        return None
+    conn   = _db_reader()
+    clan   = conn.execute("SELECT clan FROM clan_members WHERE player=?", (name,)).fetchone()
+    bounty = conn.execute("SELECT %s FROM bounties WHERE target=?" % ", ".join(_BOUNTY_COLS), (name,)).fetchone()
+    return (d, clan and clan[0], bounty and dict(zip(_BOUNTY_COLS, bounty)),
+            db_top_rivals(name, "kills"), db_top_rivals(name, "deaths"))
+
+def db_rivalry(a, b):
+    """(kills de a sur b, kills de b sur a) : une seule ligne de la table des arêtes."""
+    row = _db_reader().execute("SELECT kills, deaths FROM rivals WHERE player=? AND opponent=?", (a, b)).fetchone()
+    return tuple(row) if row else (0, 0)
+
+def db_clan(name):
+    """(clan, [(membre, kills)], [(cible, prime)]) par les index membres/primes par clan, ou None."""
+    conn = _db_reader()
+    row  = conn.execute("SELECT %s, extra FROM clans WHERE name=?" % ", ".join(_CLAN_COLS), (name,)).fetchone()
+    if row is None:
+        return None
+    clan = dict(zip(_CLAN_COLS, row[:-1]))
+    if row[-1]:
+        clan.update(json.loads(row[-1]))
+    roster = conn.execute("SELECT m.player, COALESCE(p.kills, 0) FROM clan_members m "
+                          "LEFT JOIN players p ON p.name = m.player WHERE m.clan=? ORDER BY m.player", (name,)).fetchall()
+    active = [(r[0], dict(zip(_BOUNTY_COLS, r[1:]))) for r in conn.execute(
+        "SELECT target, %s FROM bounties WHERE proposer_clan=? ORDER BY target" % ", ".join(_BOUNTY_COLS), (name,))]
+    return clan, roster, active
+
+class SqlRank:
+    """Classement lu dans SQLite (ORDER BY … LIMIT sur un index) : mêmes lectures que RankIndex."""
+
+    def __init__(self, table, col, where="1"):
+        self.table = table
+        self.col   = col
+        self.where = where   # filtre des entrées classées (comme un score None dans RankIndex)
+
+    def _query(self, sql, args=()):
+        return _db_reader().execute(sql % {"t": self.table, "c": self.col, "w": self.where}, args)
+
+    def page(self, start, n):
+        """[(nom, score)] des rangs start+1 à start+n."""
+        return self._query("SELECT name, %(c)s FROM %(t)s WHERE %(w)s ORDER BY %(c)s DESC, name LIMIT ? OFFSET ?",
+                           (n, start)).fetchall()
+
+    def top(self, n=None):
+        return self.page(0, -1 if n is None else n)
+
+    def rank(self, name):
+        """Rang (1 = premier) ou None si absent du classement."""
+        row = self._query("SELECT %(c)s FROM %(t)s WHERE name=? AND %(w)s", (name,)).fetchone()
+        if row is None:
+            return None
+        score = row[0]
+        return self._query("SELECT COUNT(*) FROM %(t)s WHERE %(w)s AND (%(c)s > ? OR (%(c)s = ? AND name < ?))",
+                           (score, score, name)).fetchone()[0] + 1
+
+    def __len__(self):
+        return self._query("SELECT COUNT(*) FROM %(t)s WHERE %(w)s").fetchone()[0]
+
+SQL_RANKS = {
+    "playtime":    SqlRank("players", "total_minutes"),
+    "kills":       SqlRank("players", "kills", "kills > 0"),
+    "clan_points": SqlRank("clans",   "points"),
+}
+
+# ── Chargement ──────────────────────────────────
+
+def _read_json_state():
+    """Snapshot JSON + journaux éventuels. Retourne (données ou None, nb d'entrées rejouées)."""
+    data = _read_snapshot()
+    replayed = 0
+    if os.path.exists(JOURNAL_OLD) or os.path.exists(JOURNAL_FILE):
+        if data is None:
+            data = {}
+        replayed  = _replay_journal(data, JOURNAL_OLD)
+        replayed += _replay_journal(data, JOURNAL_FILE)
+    return data, replayed
+
 def load_data():
-    global player_data, clans, clan_members, missions, achievements_data, bounties
+    global player_data, clans, clan_members, missions, achievements_data, bounties, ingest_state, servers
+    if _compaction_thread and _compaction_thread.is_alive():
+        _compaction_thread.join()
     try:
-        with open(DATA_FILE, 'r') as f:
-            data = json.load(f)
-        player_data       = data.get("players", {})
+        replayed = 0
+        journaled = os.path.exists(JOURNAL_OLD) or os.path.exists(JOURNAL_FILE)
+        if STORAGE_MODE == "sqlite":
+            data = _db_load()
+            if data is None:
+                data = migrate_json_to_sqlite()
+        else:
+            data, replayed = _read_json_state()
+        if data is None:
+            raise FileNotFoundError(DATA_FILE)
+        rivalries.clear()
+        player_data       = {name_table.intern(n): PlayerRecord.from_json(n, d) for n, d in data.get("players", {}).items()}
         clans             = data.get("clans", {})
         clan_members      = data.get("clan_members", {})
         missions          = data.get("missions", {})
         achievements_data = data.get("achievements", {})
+        ingest_state      = data.get("ingest", {})
+        servers           = data.get("servers", {})
         bounties          = data.get("bounties", {})
         saved_config = data.get("config", {})
         for k, v in saved_config.items():
             if k in CONFIG:
                 CONFIG[k] = v
-        print(f"[Data] Chargé : {len(player_data)} joueurs, {len(clans)} clans, {len(bounties)} primes actives")
+        _load_ledger()
+        rebuild_indexes()
+        sync_monitored()
+        if STORAGE_MODE != "sqlite" and journaled:
+            # Démarrage : on repart d'un snapshot propre et d'un journal vide
+            # (évite aussi d'ajouter à la suite d'une ligne tronquée par un crash)
+            _write_atomic(DATA_FILE, data)
+            for path in (JOURNAL_OLD, JOURNAL_FILE):
+                if os.path.exists(path):
+                    os.remove(path)
+        print(f"[Data] Chargé ({STORAGE_MODE}) : {len(player_data)} joueurs, {len(clans)} clans, {len(bounties)} primes actives"
+              + (f" ({replayed} entrées de journal rejouées)" if replayed else ""))
     except FileNotFoundError:
         print("[Data] Nouveau fichier, démarrage vide")
-        player_data = {}; clans = {}; clan_members = {}
-        missions = {}; achievements_data = {}; bounties = {}
+        player_data = {}; clans = {}; clan_members = {}; rivalries.clear()
+        missions = {}; achievements_data = {}; bounties = {}; ingest_state = {}; servers = {}
+        rebuild_indexes()
+        sync_monitored()
     except Exception as e:
         print(f"[Erreur] Chargement : {e}")
+        sync_monitored()
+
+def _take_snapshot():
+    """Copie cohérente de ce qui doit être écrit (à appeler depuis la boucle asyncio).
+
+    Les files d'attente ne sont vidées qu'une fois la copie faite ; si l'écriture échoue
+    ensuite, _requeue_snapshot les remet en place.
+    """
+    global _save_requested
+    if STORAGE_MODE == "json":
+        rest = copy.deepcopy({
+            "clans":        clans,
+            "clan_members": clan_members,
+            "missions":     missions,
+            "achievements": achievements_data,
+            "bounties":     bounties,
+            "ingest":       ingest_state,
+            "servers":      servers,
+            "config":       CONFIG,
+        })
+        body = {"players": {n: d.to_json() for n, d in player_data.items()}, **rest}
+        kind = "full"
+    else:
+        if not _dirty and not ingest_ledger.pending:
+            _save_requested = False
+            return None
+        colls = _collections()
+        body  = []
+        for coll, key in _dirty:
+            src = colls[coll]
+            body.append((coll, key, _export(src[key])) if key in src else (coll, key, _DELETED))
+        kind = STORAGE_MODE
+    _save_requested = False
+    _dirty.clear()
+    return (kind, ingest_ledger.take_pending(), body)
+
+def _requeue_snapshot(payload):
+    """Écriture échouée : entrées et empreintes repartent en attente, le prochain passage réessaie."""
+    global _save_requested
+    kind, fps, body = payload
+    if kind != "full":
+        # Clés seulement : la valeur réécrite sera celle en mémoire au prochain passage
+        _dirty.update((coll, key) for coll, key, _ in body)
+    ingest_ledger.pending[:0] = fps
+    _save_requested = True
+
+def _write_payload(payload):
+    """Sérialise et écrit un snapshot pris par _take_snapshot (peut tourner dans un thread)."""
+    kind, fps, body = payload
+    # Stats d'abord, empreintes ensuite : un crash entre les deux ne peut pas faire perdre de kills
+    n = _write_body(kind, body)
+    if fps:
+        _append_ledger(fps)
+    return n
+
+def _write_body(kind, body):
+    if kind == "full":
+        _write_atomic(DATA_FILE, body)
+        return len(body["players"])
+    if not body:
+        return 0
+    if kind == "sqlite":
+        _db_apply(body)
+        return len(body)
+    lines = []
+    for coll, key, val in body:
+        rec = {"c": coll, "k": key, "d": 1} if val is _DELETED else {"c": coll, "k": key, "v": val}
+        lines.append(json.dumps(rec, ensure_ascii=False) + "\n")
+    with open(JOURNAL_FILE, 'a', encoding='utf-8') as f:
+        f.write("".join(lines))
+        f.flush()
+        os.fsync(f.fileno())
+    _maybe_compact()
+    return len(lines)
 
 def save_data():
+    """Marque l'état comme modifié : l'écriture réelle est faite par persistence_flusher."""
+    global _save_requested
+    _save_requested = True
+
+def flush_now():
+    """Sauvegarde synchrone immédiate (arrêt du bot)."""
+    payload = None
     try:
-        with open(DATA_FILE, 'w') as f:
-            json.dump({
-                "players":      player_data,
-                "clans":        clans,
-                "clan_members": clan_members,
-                "missions":     missions,
-                "achievements": achievements_data,
-                "bounties":     bounties,
-                "config":       CONFIG,
-            }, f, indent=2, ensure_ascii=False)
+        payload = _take_snapshot()
+        return _write_payload(payload) if payload else 0
     except Exception as e:
         print(f"[Erreur] Sauvegarde : {e}")
+        if payload:
+            _requeue_snapshot(payload)
+        return 0
+
+async def flush_data():
+    """Sauvegarde immédiate : copie sur la boucle, sérialisation + écriture dans un thread."""
+    async with _flush_lock:
+        payload = None
+        try:
+            payload = _take_snapshot()
+            if not payload:
+                return 0
+            return await asyncio.to_thread(_write_payload, payload)
+        except Exception as e:
+            print(f"[Erreur] Sauvegarde : {e} (nouvel essai au prochain passage)")
+            if payload:
+                _requeue_snapshot(payload)
+            return 0
+
+@tasks.loop(seconds=5)
+async def persistence_flusher():
+    # Au plus une écriture par intervalle, quel que soit le nombre de modifications entre-temps
+    achievement_engine.commit()
+    if _save_requested or _dirty:
+        await flush_data()
+    interval = max(1, CONFIG["SAVE_INTERVAL_SECONDS"])
+    if persistence_flusher.seconds != interval:
+        persistence_flusher.change_interval(seconds=interval)
 
 # ══════════════════════════════════════════════
 #  GESTION JOUEURS
 # ══════════════════════════════════════════════
 
+# ── Fiches joueurs compactes ────────────────────
+# En mémoire : compteurs en slots, dates en secondes epoch, achievements en bitset ;
+# les rivalités vivent dans le graphe `rivalries`. Sur disque : le format JSON historique.
+
+class NameTable:
+    """Chaînes internées ↔ identifiants entiers stables pendant la vie du processus."""
+
+    def __init__(self):
+        self.ids   = {}
+        self.names = []
+
+    def id(self, name):
+        i = self.ids.get(name)
+        if i is None:
+            name = sys.intern(name)
+            i = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return i
+
+    def intern(self, name):
+        return self.names[self.id(name)]
+
+name_table = NameTable()   # pseudos (clés de player_data, adversaires des rivalités)
+ach_table  = NameTable()   # identifiants d'achievements → position dans le bitset
+
+_COUNTERS = ("total_minutes", "sessions", "kills", "deaths", "zombie_kills", "clan_kills")
+_STAMPS   = ("last_seen", "first_seen")
+
+def _epoch(value):
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return int(value.timestamp())
+
+def _iso(epoch):
+    return None if epoch is None else datetime.fromtimestamp(epoch).isoformat()
+
+class PlayerRecord:
+    """Fiche d'un joueur. Accès façon dict (`d["kills"]`, `d.get(...)`) pour le code d'affichage ;
+    to_json() / from_json() convertissent depuis et vers le format de server_data.json."""
+
+    __slots__ = _COUNTERS + _STAMPS + ("id", "ach", "extra")
+
+    def __init__(self, name, first_seen=None):
+        self.id            = name_table.id(name)
+        self.total_minutes = self.sessions = self.kills = self.deaths = 0
+        self.zombie_kills  = self.clan_kills = 0
+        self.last_seen     = None
+        self.first_seen    = first_seen
+        self.ach           = 0      # bit n = achievement n de ach_table
+        self.extra         = None   # clés inconnues conservées telles quelles
+
+    # ── achievements / rivalités ──
+    def has_achievement(self, ach_id):
+        return bool(self.ach >> ach_table.id(ach_id) & 1)
+
+    def add_achievement(self, ach_id):
+        self.ach |= 1 << ach_table.id(ach_id)
+
+    def achievements(self):
+        return [a for i, a in enumerate(ach_table.names) if self.ach >> i & 1]
+
+    def rival(self, opponent):
+        """(kills sur `opponent`, morts contre `opponent`)."""
+        o = name_table.ids.get(opponent)
+        return (0, 0) if o is None else rivalries.pair(self.id, o)
+
+    def rivals_view(self):
+        names = name_table.names
+        return {names[o]: {"kills": k, "deaths": d} for o, (k, d) in rivalries.view(self.id).items()}
+
+    # ── accès façon dict ──
+    def __getitem__(self, key):
+        if key in _COUNTERS:     return getattr(self, key)
+        if key in _STAMPS:       return _iso(getattr(self, key))
+        if key == "achievements": return self.achievements()
+        if key == "rivals":       return self.rivals_view()
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        # Toute écriture d'un compteur passe par ici : le moteur d'achievements en est notifié
+        self._set(key, value)
+        if key in _COUNTERS:
+            achievement_engine.observe(self, key, value)
+
+    def _set(self, key, value):
+        if key in _COUNTERS:
+            setattr(self, key, value)
+        elif key in _STAMPS:
+            setattr(self, key, _epoch(value))
+        elif key == "achievements":
+            self.ach = 0
+            for a in value:
+                self.add_achievement(a)
+        elif key == "rivals":
+            # Chargement : chaque fiche redonne les deux sens de ses arêtes (valeurs absolues)
+            for o, r in value.items():
+                rivalries.set(self.id, name_table.id(o), r.get("kills", 0), r.get("deaths", 0))
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __contains__(self, key):
+        return key in _COUNTERS or key in _STAMPS or key in ("achievements", "rivals") or bool(self.extra and key in self.extra)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    # ── sérialisation ──
+    def to_json(self):
+        d = {c: getattr(self, c) for c in _COUNTERS}
+        d["last_seen"]    = _iso(self.last_seen)
+        d["first_seen"]   = _iso(self.first_seen)
+        d["achievements"] = self.achievements()
+        d["rivals"]       = self.rivals_view()
+        if self.extra:
+            d.update(copy.deepcopy(self.extra))
+        return d
+
+    @classmethod
+    def from_json(cls, name, data):
+        rec = cls(name)
+        for key, value in data.items():
+            rec._set(key, value)   # chargement : pas de déblocage rétroactif
+        return rec
+
+def _export(val):
+    """Copie sérialisable d'une entrée de collection (pour la sauvegarde)."""
+    return val.to_json() if isinstance(val, PlayerRecord) else copy.deepcopy(val)
+
 def init_player(name):
     if name not in player_data:
-        player_data[name] = {
-            "total_minutes": 0, "sessions": 0,
-            "kills": 0, "deaths": 0,
-            "zombie_kills": 0, "clan_kills": 0,
-            "last_seen": None,
-            "first_seen": datetime.now().isoformat(),
-            "achievements": [],
-            "rivals": {}
-        }
-
-def update_playtime(name, minutes):
+        player_data[name_table.intern(name)] = PlayerRecord(name, first_seen=int(time.time()))
+        mark_dirty("players", name)
+
+def update_playtime(name, minutes, when=None):
     init_player(name)
-    player_data[name]["total_minutes"] += minutes
-    player_data[name]["sessions"]      += 1
-    player_data[name]["last_seen"]      = datetime.now().isoformat()
+    d = player_data[name]
+    d["total_minutes"] += minutes
+    d["sessions"]      += 1
+    d.last_seen         = _epoch(when or datetime.now())
+    mark_dirty("players", name)
     if name in clan_members:
         cn = clan_members[name]
         if cn in clans:
             pts = int(minutes / 60) * CONFIG["POINTS_PER_HOUR"]
             if pts > 0:
                 clans[cn]["points"] += pts
-    if player_data[name]["total_minutes"] >= CONFIG["HOURS_FOR_ACTIVE_ROLE"] * 60:
-        check_achievement(name, "survivor_10h")
+                mark_dirty("clans", cn)
+    achievement_engine.commit()
     save_data()
 
 def record_rivalry(killer, victim):
-    player_data[killer].setdefault("rivals", {})
-    player_data[killer]["rivals"].setdefault(victim, {"kills": 0, "deaths": 0})
-    player_data[killer]["rivals"][victim]["kills"] += 1
+    k, v = player_data[killer], player_data[victim]
+    rivalries.add(k.id, v.id)
+    mark_dirty("players", killer, victim)
+    kills, revenge = rivalries.pair(k.id, v.id)
+    achievement_engine.observe(k, "rival_kills", kills)      # kills sur cette victime
+    achievement_engine.observe(k, "revenge",     revenge)    # fois où la victime l'avait tué
+
+def record_bounty_claim(killer):
+    # Compteur persisté dans la fiche (clé hors colonnes → `extra`, conservée en JSON comme en SQLite)
+    k = player_data[killer]
+    k["bounties_claimed"] = k.get("bounties_claimed", 0) + 1
+    mark_dirty("players", killer)
+    achievement_engine.observe(k, "bounties_claimed", k["bounties_claimed"])
+
+# ── Classements ─────────────────────────────────
+
+class RankIndex:
+    """Classement trié par score décroissant (puis par nom) : top-N et rang sans tri complet.
+
+    `key(entrée)` donne le score, ou None pour sortir l'entrée du classement.
+    Mise à jour par recherche dichotomique (bisect) dans la liste triée.
+    """
 
-    player_data[victim].setdefault("rivals", {})
-    player_data[victim]["rivals"].setdefault(killer, {"kills": 0, "deaths": 0})
-    player_data[victim]["rivals"][killer]["deaths"] += 1
+    def __init__(self, key, limit=None):
+        self.key    = key
+        self.limit  = limit   # ne garder que les `limit` premiers (scores qui ne font que monter)
+        self.items  = []      # [(-score, nom)] trié
+        self.scores = {}
+
+    def update(self, name, entry):
+        score = None if entry is None else self.key(entry)
+        old   = self.scores.get(name)
+        if old == score:
+            return
+        if old is not None:
+            del self.items[bisect_left(self.items, (-old, name))]
+            del self.scores[name]
+        if score is not None:
+            self.scores[name] = score
+            insort(self.items, (-score, name))
+            if self.limit and len(self.items) > self.limit:
+                del self.scores[self.items.pop()[1]]
+
+    def rebuild(self, source):
+        """Reconstruction complète depuis une collection {nom: entrée} (un seul tri)."""
+        scores      = ((name, self.key(entry)) for name, entry in source.items())
+        self.scores = {name: sc for name, sc in scores if sc is not None}
+        self.items  = sorted((-sc, name) for name, sc in self.scores.items())[:self.limit]
+        if self.limit:
+            self.scores = {name: -neg for neg, name in self.items}
+
+    def top(self, n=None):
+        """[(nom, score)] des n premiers (tous si n est None)."""
+        return [(name, -neg) for neg, name in self.items[:n]]
+
+    def page(self, start, n):
+        """[(nom, score)] des rangs start+1 à start+n : coût proportionnel à la page seule."""
+        return [(name, -neg) for neg, name in self.items[start:start + n]]
+
+    def at_least(self, score):
+        """[(nom, score)] de tous ceux dont le score est >= `score`."""
+        return self.top(bisect_right(self.items, -score, key=lambda it: it[0]))
+
+    def rank(self, name):
+        """Rang (1 = premier) ou None si absent du classement."""
+        score = self.scores.get(name)
+        if score is None:
+            return None
+        return bisect_left(self.items, (-score, name)) + 1
+
+    def __len__(self):
+        return len(self.items)
+
+class PrefixIndex:
+    """Noms triés sans casse : complétion par préfixe (bisect), classée par activité récente.
+
+    Même interface que RankIndex (update / items / scores) pour être tenu à jour par ranking().
+    Un préfixe qui couvre plus de HEAVY noms garde ses `K` plus actifs en cache, mis à jour
+    nom par nom : une complétion ne trie donc jamais plus de HEAVY noms.
+    """
+
+    HEAVY = 1000
+    K     = 25
+
+    def __init__(self, activity):
+        self.activity = activity   # index de RANKS qui ordonne les suggestions
+        self.items    = []         # [(nom normalisé, nom)] trié
+        self.scores   = {}         # nom → nom normalisé
+        self.heavy    = {}         # préfixe très partagé → [K noms les plus actifs]
+
+    def _act(self, name):
+        return RANKS[self.activity].scores.get(name, float("-inf"))
+
+    def update(self, name, entry):
+        key = None if entry is None else name.casefold()
+        old = self.scores.get(name)
+        if old != key:
+            if old is not None:
+                del self.items[bisect_left(self.items, (old, name))]
+                del self.scores[name]
+                self._forget(name, old)
+            if key is not None:
+                self.scores[name] = key
+                insort(self.items, (key, name))
+        if key is not None:
+            self._touch(name, key)   # l'activité a pu changer même si le nom n'a pas bougé
+
+    def _touch(self, name, key):
+        score = self._act(name)
+        for n in range(len(key) + 1):
+            p   = key[:n]
+            top = self.heavy.get(p)
+            if top is None:
+                continue
+            if name in top:
+                top.sort(key=self._act, reverse=True)
+                if top[-1] == name:
+                    # Peut-être descendu sous un nom hors du cache : recalcul à la prochaine demande
+                    del self.heavy[p]
+            elif len(top) < self.K or score > self._act(top[-1]):
+                top.append(name)
+                top.sort(key=self._act, reverse=True)
+                del top[self.K:]
+
+    def _forget(self, name, key):
+        for n in range(len(key) + 1):
+            top = self.heavy.get(key[:n])
+            if top is not None and name in top:
+                del self.heavy[key[:n]]
+
+    def rebuild(self, source):
+        self.scores = {name: name.casefold() for name in source}
+        self.items  = sorted((key, name) for name, key in self.scores.items())
+        self.heavy  = {}
+
+    def complete(self, prefix, limit=25):
+        """Jusqu'à `limit` noms commençant par `prefix`, les plus actifs d'abord."""
+        p  = prefix.casefold()
+        lo = bisect_left(self.items, (p,))
+        hi = bisect_left(self.items, (p + "\U0010ffff",))
+        if hi - lo > self.HEAVY and limit <= self.K:
+            top = self.heavy.get(p)
+            if top is None:
+                # Première demande (ou cache invalidé) : un seul passage sur les correspondances
+                top = self.heavy[p] = self._best(lo, hi, self.K)
+            return top[:limit]
+        return self._best(lo, hi, limit)
+
+    def _best(self, lo, hi, n):
+        return heapq.nlargest(n, (name for _, name in self.items[lo:hi]), key=self._act)
+
+    def __len__(self):
+        return len(self.items)
+
+def _activity(d):
+    # Dernière connexion (ou première apparition) en timestamp, pour classer les suggestions
+    return d.last_seen or d.first_seen or 0
+
+def kd_ratio(d):
+    return d.kills / d.deaths if d.deaths > 0 else float(d.kills)
+
+# ── Rivalités ───────────────────────────────────
+
+_LOW32 = 0xFFFFFFFF
+
+class RivalryGraph:
+    """Graphe creux des kills entre joueurs (identifiants de name_table).
+
+    Une seule arête par paire {a, b}, clé `min << 32 | max`, valeur `kills(min→max) << 32 | kills(max→min)` :
+    les deux sens d'une rivalité se lisent au même endroit. Chaque joueur garde en plus ses `k`
+    victimes et ses `k` tueurs principaux (tuples d'identifiants), mis à jour à chaque kill.
+    """
+
+    def __init__(self, k=3, top=100):
+        self.k       = k
+        self.edges   = {}
+        self.adj     = {}   # id → [ids des adversaires]
+        self.victims = {}   # id → (ids) par kills décroissants
+        self.killers = {}   # id → (ids) par morts décroissantes
+        self.loaded  = {}   # chargement : (a, b) → vue de la fiche de a, arbitrée par rebuild()
+        # Les `top` arêtes les plus disputées : les totaux ne font que monter entre deux remove_player
+        self.ranks   = RankIndex(lambda total: total or None, limit=top)
+
+    @staticmethod
+    def _key(a, b):
+        return a << 32 | b if a <= b else b << 32 | a
+
+    def pair(self, a, b):
+        """(kills de a sur b, kills de b sur a)."""
+        e = self.edges.get(self._key(a, b), 0)
+        return (e >> 32, e & _LOW32) if a <= b else (e & _LOW32, e >> 32)
+
+    def _link(self, a, b, ab, ba):
+        key = self._key(a, b)
+        if key not in self.edges:
+            self.adj.setdefault(a, []).append(b)
+            if a != b:
+                self.adj.setdefault(b, []).append(a)
+        self.edges[key] = ab << 32 | ba if a <= b else ba << 32 | ab
+        if a != b:
+            self.ranks.update(key, ab + ba)
+
+    def add(self, killer, victim):
+        ab, ba = self.pair(killer, victim)
+        if killer == victim:
+            ba += 1   # suicide : compté comme kill et comme mort, comme avant
+        self._link(killer, victim, ab + 1, ba)
+        self._bump(self.victims, killer, victim, 0)
+        self._bump(self.killers, victim, killer, 1)
+
+    def set(self, a, b, ab, ba):
+        """Chargement : (kills, morts) de `a` contre `b` lus dans la fiche de a ; rebuild() crée l'arête."""
+        self.loaded[(a, b)] = (ab, ba)
+
+    def _merge_loaded(self):
+        # Les fiches d'avant le graphe peuvent se contredire : l'ancien /resetstats ne vidait que la
+        # fiche remise à zéro, pas l'entrée chez l'adversaire. Les deux côtés étant toujours incrémentés
+        # ensemble, le vrai compteur est le plus petit des deux : chaque sens prend le minimum des deux
+        # vues, et une paire absente d'une des deux fiches est abandonnée (indépendant de l'ordre de chargement).
+        loaded, self.loaded = self.loaded, {}
+        for (a, b), (ab, ba) in loaded.items():
+            other = loaded.get((b, a))
+            if other is None or a > b:
+                continue
+            self._link(a, b, min(ab, other[1]), min(ba, other[0]))
+
+    def _bump(self, table, owner, other, side):
+        # Les compteurs ne font que monter : `other` entre dans le top-k ou y remonte
+        top = table.get(owner, ())
+        if other not in top:
+            top += (other,)
+        table[owner] = tuple(sorted(top, key=lambda o: self.pair(owner, o)[side], reverse=True)[:self.k])
+
+    def _summarise(self, pid):
+        others = self.adj.get(pid, ())
+        for table, side in ((self.victims, 0), (self.killers, 1)):
+            best = heapq.nlargest(self.k, ((self.pair(pid, o)[side], o) for o in others))
+            best = tuple(o for n, o in best if n > 0)
+            if best:
+                table[pid] = best
+            else:
+                table.pop(pid, None)
+
+    def rebuild(self):
+        self._merge_loaded()
+        for pid in self.adj:
+            self._summarise(pid)
+        self._rerank()
+
+    def _rerank(self):
+        self.ranks.rebuild({key: (e >> 32) + (e & _LOW32) for key, e in self.edges.items()
+                            if key >> 32 != key & _LOW32})
+
+    def clear(self):
+        self.edges.clear(); self.adj.clear(); self.victims.clear(); self.killers.clear(); self.loaded.clear()
+        self.ranks.rebuild({})
+
+    def remove_player(self, pid):
+        """Efface toutes les arêtes de `pid`. Retourne les ids des adversaires touchés."""
+        others = self.adj.pop(pid, [])
+        for o in others:
+            self.edges.pop(self._key(pid, o), None)
+            if o != pid:
+                self.adj[o].remove(pid)
+                self._summarise(o)
+        self.victims.pop(pid, None); self.killers.pop(pid, None)
+        self._rerank()   # des arêtes hors du top peuvent reprendre les places libérées
+        return [o for o in others if o != pid]
+
+    def top_victims(self, pid):
+        """[(id, kills)] des victimes préférées de `pid`."""
+        return [(o, self.pair(pid, o)[0]) for o in self.victims.get(pid, ())]
+
+    def top_killers(self, pid):
+        """[(id, morts)] des joueurs qui tuent le plus `pid`."""
+        return [(o, self.pair(pid, o)[1]) for o in self.killers.get(pid, ())]
+
+    def view(self, pid):
+        """{adversaire: (kills, morts)} de `pid` (format des fiches JSON)."""
+        return {o: self.pair(pid, o) for o in self.adj.get(pid, ())}
+
+    @staticmethod
+    def ends(key):
+        return key >> 32, key & _LOW32
+
+rivalries = RivalryGraph()
+
+RANKS = {
+    "playtime":    RankIndex(lambda d: d.total_minutes),
+    "kills":       RankIndex(lambda d: d.kills or None),
+    "kd":          RankIndex(lambda d: kd_ratio(d) if d.kills else None),
+    "clan_points": RankIndex(lambda c: c["points"]),
+    "recent":      RankIndex(_activity),
+    # Index de complétion (autocomplete), tenus à jour de la même façon
+    "player_names": PrefixIndex("recent"),
+    "clan_names":   PrefixIndex("clan_points"),
+    # Tenu à jour par rivalries à chaque kill (clé = arête, score = affrontements)
+    "rivalries":    rivalries.ranks,
+}
+_RANKED     = {"players": ("playtime", "kills", "kd", "recent", "player_names"), "clans": ("clan_points", "clan_names")}
+_rank_stale = set()   # (collection, clé) modifiées depuis la dernière lecture d'un classement
+
+def ranking(name):
+    """Index de classement à jour : seules les entrées signalées par mark_dirty sont recalculées."""
+    if _rank_stale:
+        sources = {"players": player_data, "clans": clans}
+        for coll, key in _rank_stale:
+            entry = sources[coll].get(key)
+            for idx in _RANKED[coll]:
+                RANKS[idx].update(key, entry)
+        _rank_stale.clear()
+    return RANKS[name]
+
+def board_index(name):
+    """Classement à lire : requêtes indexées (SQL_RANKS) en mode sqlite, sinon l'index en mémoire."""
+    if STORAGE_MODE == "sqlite" and name in SQL_RANKS:
+        return SQL_RANKS[name]
+    return ranking(name)
+
+def rebuild_indexes():
+    # Après un chargement : les collections ont été remplacées
+    render_cache.clear()
+    _rank_stale.clear()
+    sources = {"players": player_data, "clans": clans}
+    for coll, names in _RANKED.items():
+        for name in names:
+            RANKS[name].rebuild(sources[coll])
+    for coll, idx in _REVERSE.items():
+        idx.groups, idx.of = {}, {}
+        for k, v in _collections()[coll].items():
+            idx.update(k, v)
+    rivalries.rebuild()
+    achievement_engine.reset()
+
+# ── Index inverses des clans ────────────────────
+
+class ReverseIndex:
+    """Index inverse valeur → {clés} d'une collection, tenu à jour entrée par entrée par mark_dirty."""
+
+    def __init__(self, value):
+        self.value  = value
+        self.groups = {}   # valeur → set(clés)
+        self.of     = {}   # clé → valeur indexée
+
+    def update(self, key, entry):
+        new = None if entry is None else self.value(entry)
+        old = self.of.get(key)
+        if old == new:
+            return
+        if old is not None:
+            group = self.groups[old]
+            group.discard(key)
+            if not group:
+                del self.groups[old]
+            del self.of[key]
+        if new is not None:
+            self.of[key] = new
+            self.groups.setdefault(new, set()).add(key)
+
+    def get(self, value):
+        return self.groups.get(value, frozenset())
+
+clan_roster   = ReverseIndex(lambda clan: clan)               # clan → joueurs
+clan_bounties = ReverseIndex(lambda b: b["proposer_clan"])    # clan → cibles des primes qu'il a posées
+_REVERSE      = {"clan_members": clan_roster, "bounties": clan_bounties}
+
+def members_of(clan):
+    """Membres d'un clan, triés par nom."""
+    return sorted(clan_roster.get(clan))
+
+def member_count(clan):
+    return len(clan_roster.get(clan))
+
+def bounties_of(clan):
+    """[(cible, prime)] posées par un clan."""
+    return [(t, bounties[t]) for t in sorted(clan_bounties.get(clan))]
+
+# ── Cache de rendu des embeds ───────────────────
+
+# Compteurs de modifications, incrémentés par mark_dirty : version globale d'une collection
+# (classements, listes) et version par entrée ((collection, clé) : un joueur, un clan…)
+_versions = collections.Counter()
+
+class RenderCache:
+    """Cache LRU d'embeds déjà construits, valides tant que leurs versions de données n'ont pas bougé."""
+
+    def __init__(self):
+        self.entries = collections.OrderedDict()   # (commande, args) → (versions, embeds)
+        self.hits    = 0
+        self.misses  = 0
+
+    def get(self, key, deps, build, ttl=None):
+        """Embeds pour `key` ; `build()` n'est appelé que si une version de `deps` a changé
+        (ou, avec `ttl`, si le rendu a plus de `ttl` secondes)."""
+        version = tuple(_versions[d] for d in deps)
+        cached  = self.entries.get(key)
+        now     = time.monotonic()
+        if cached is not None and cached[0] == version and (ttl is None or now - cached[2] < ttl):
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        embeds = build()
+        self.entries[key] = (version, embeds, now)
+        self.entries.move_to_end(key)
+        while len(self.entries) > max(1, CONFIG["RENDER_CACHE_SIZE"]):
+            self.entries.popitem(last=False)
+        return embeds
+
+    def clear(self):
+        self.entries.clear()
+
+render_cache = RenderCache()
 
 # ══════════════════════════════════════════════
 #  ACHIEVEMENTS
 # ══════════════════════════════════════════════
 
+# Chaque règle nomme la stat qu'elle surveille et son seuil (nombre, ou fonction lue dans CONFIG).
+# Stats : compteurs des fiches joueurs (écrits via d["..."]) ou événements émis par observe().
 ACHIEVEMENTS = {
-    "first_blood":   {"name": "🩸 Premier Sang",        "desc": "1er kill PvP",                           "points": 50},
-    "survivor_10h":  {"name": "🏆 Survivant",           "desc": "10h de jeu cumulées",                   "points": 100},
-    "zombie_hunter": {"name": "🧟 Chasseur de Zombies", "desc": "100 zombies tués",                      "points": 200},
-    "pvp_master":    {"name": "⚔️ Maître PvP",          "desc": "50 kills PvP",                          "points": 300},
-    "clan_warrior":  {"name": "🛡️ Guerrier de Clan",   "desc": "10 kills inter-clans",                  "points": 150},
-    "nemesis":       {"name": "😈 Nemesis",              "desc": "Tuer le même joueur 5 fois",            "points": 100},
-    "comeback":      {"name": "🔥 Comeback",             "desc": "Tuer quelqu'un qui t'avait tué 3+ fois","points": 125},
-    "bounty_hunter": {"name": "💰 Chasseur de Primes",  "desc": "Récupérer une prime",                   "points":  75},
+    "first_blood":   {"name": "🩸 Premier Sang",        "desc": "1er kill PvP",                           "points": 50,
+                      "stat": "kills",            "threshold": 1},
+    "survivor_10h":  {"name": "🏆 Survivant",           "desc": "10h de jeu cumulées",                   "points": 100,
+                      "stat": "total_minutes",    "threshold": lambda: CONFIG["HOURS_FOR_ACTIVE_ROLE"] * 60},
+    "zombie_hunter": {"name": "🧟 Chasseur de Zombies", "desc": "100 zombies tués",                      "points": 200,
+                      "stat": "zombie_kills",     "threshold": 100},
+    "pvp_master":    {"name": "⚔️ Maître PvP",          "desc": "50 kills PvP",                          "points": 300,
+                      "stat": "kills",            "threshold": 50},
+    "clan_warrior":  {"name": "🛡️ Guerrier de Clan",   "desc": "10 kills inter-clans",                  "points": 150,
+                      "stat": "clan_kills",       "threshold": 10},
+    "nemesis":       {"name": "😈 Nemesis",              "desc": "Tuer le même joueur 5 fois",            "points": 100,
+                      "stat": "rival_kills",      "threshold": 5},
+    "comeback":      {"name": "🔥 Comeback",             "desc": "Tuer quelqu'un qui t'avait tué 3+ fois","points": 125,
+                      "stat": "revenge",          "threshold": 3},
+    "bounty_hunter": {"name": "💰 Chasseur de Primes",  "desc": "Récupérer une prime",                   "points":  75,
+                      "stat": "bounties_claimed", "threshold": 1},
 }
 
-def check_achievement(player, ach_id, extra=None):
-    if ach_id not in ACHIEVEMENTS or player not in player_data: return False
-    if ach_id in player_data[player].get("achievements", []):   return False
-    d = player_data[player]
-    earned = False
-    if   ach_id == "first_blood"   and d["kills"] >= 1:                                        earned = True
-    elif ach_id == "survivor_10h"  and d["total_minutes"] >= CONFIG["HOURS_FOR_ACTIVE_ROLE"]*60: earned = True
-    elif ach_id == "zombie_hunter" and d["zombie_kills"] >= 100:                               earned = True
-    elif ach_id == "pvp_master"    and d["kills"] >= 50:                                       earned = True
-    elif ach_id == "clan_warrior"  and d.get("clan_kills", 0) >= 10:                           earned = True
-    elif ach_id == "nemesis"       and extra and d.get("rivals", {}).get(extra, {}).get("kills", 0) >= 5: earned = True
-    elif ach_id == "comeback"      and extra and d.get("rivals", {}).get(extra, {}).get("deaths", 0) >= 3: earned = True
-    elif ach_id == "bounty_hunter":                                                            earned = True
-
-    if earned:
-        player_data[player].setdefault("achievements", []).append(ach_id)
-        if player in clan_members:
-            cn = clan_members[player]
-            if cn in clans:
-                clans[cn]["points"] += ACHIEVEMENTS[ach_id]["points"]
+# Bits du bitset dans l'ordre du registre : c'est l'ordre d'affichage de /stats
+for _ach in ACHIEVEMENTS:
+    ach_table.id(_ach)
+
+class AchievementEngine:
+    """Évalue les règles de ACHIEVEMENTS à chaque changement de stat.
+
+    Par stat : seuils triés et masques cumulés des bits d'achievements (masks[i] = règles 0..i).
+    Un changement coûte une recherche dichotomique et un ET binaire avec le bitset du joueur,
+    quel que soit le nombre de règles. Les déblocages s'accumulent jusqu'à commit().
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.index    = {}     # stat → (seuils triés, masques cumulés)
+        self.built_at = None   # version de CONFIG utilisée pour les seuils
+        self.pending  = {}     # id joueur → bits débloqués depuis le dernier commit
+
+    def _build(self):
+        rules = collections.defaultdict(list)
+        for ach_id, rule in self.registry.items():
+            t = rule["threshold"]
+            rules[rule["stat"]].append((t() if callable(t) else t, 1 << ach_table.id(ach_id)))
+        self.index = {}
+        for stat, entries in rules.items():
+            entries.sort(key=lambda e: e[0])
+            masks, acc = [], 0
+            for _, bit in entries:
+                acc |= bit
+                masks.append(acc)
+            self.index[stat] = ([t for t, _ in entries], masks)
+        self.built_at = _versions["config"]
+
+    def reset(self):
+        # Après un chargement : fiches et CONFIG remplacées
+        self.built_at = None
+        self.pending.clear()
+
+    def observe(self, record, stat, value):
+        """`stat` du joueur vaut maintenant `value` : marque les règles franchies (sans les appliquer)."""
+        if self.built_at != _versions["config"]:
+            self._build()
+        rules = self.index.get(stat)
+        if rules is None:
+            return
+        i = bisect_right(rules[0], value)
+        new = rules[1][i-1] & ~record.ach if i else 0
+        if new:
+            record.ach |= new
+            self.pending[record.id] = self.pending.get(record.id, 0) | new
+
+    def commit(self):
+        """Applique les déblocages en attente : points de clan, entrées modifiées, une seule sauvegarde."""
+        if not self.pending:
+            return []
+        unlocked = []
+        for pid, bits in self.pending.items():
+            player = name_table.names[pid]
+            ids    = [a for i, a in enumerate(ach_table.names) if bits >> i & 1 and a in self.registry]
+            pts    = sum(self.registry[a]["points"] for a in ids)
+            cn     = clan_members.get(player)
+            if cn in clans and pts:
+                clans[cn]["points"] += pts
+                mark_dirty("clans", cn)
+            mark_dirty("players", player)
+            unlocked += [(player, a) for a in ids]
+        self.pending.clear()
+        print(f"[Achievement] {', '.join(f'{p} → {a}' for p, a in unlocked)}")
         save_data()
-        return ACHIEVEMENTS[ach_id]
-    return False
+        return unlocked
+
+achievement_engine = AchievementEngine(ACHIEVEMENTS)
 
 # ══════════════════════════════════════════════
 #  PARSING LOGS MINECRAFT
 # ══════════════════════════════════════════════
 
-def parse_minecraft_logs(log_content):
-    events = []
+def parse_minecraft_logs(log_content, base_date=None):
+    """Texte complet (ou itérable de lignes) → liste d'événements.
 
-    # Supporte les deux formats :
-    # Vanilla/Spigot : [HH:MM:SS] [Server thread/INFO] ...
-    # Forge Aternos  : [DDMmmYYYY HH:MM:SS.mmm] [Server thread/INFO] ...
-    TIME_PAT = r"(?:\[\d{2}:\d{2}:\d{2}\]|\[\d{1,2}\w+\d{4}\s+\d{2}:\d{2}:\d{2}\.\d+\])"
+    `base_date` : date de la première ligne Vanilla (par défaut aujourd'hui).
+    """
+    if isinstance(log_content, str):
+        log_content = log_content.split('\n')
+    return list(iter_log_events(log_content, LogClock(base_date or date.today())))
+
+# Supporte les deux formats :
+# Vanilla/Spigot : [HH:MM:SS] [Server thread/INFO] ...
+# Forge Aternos  : [DDMmmYYYY HH:MM:SS.mmm] [Server thread/INFO] ...
+TIME_PAT = r"(?:\[\d{2}:\d{2}:\d{2}\]|\[\d{1,2}\w+\d{4}\s+\d{2}:\d{2}:\d{2}\.\d+\])"
+
+_TIME_RE  = re.compile(TIME_PAT)
+_FORGE_TS = re.compile(r"\[(\d{1,2})([A-Za-z]{3})(\d{4})\s+(\d{2}):(\d{2}):(\d{2})\.(\d+)\]")
+_MONTHS   = {m: i for i, m in enumerate(("Jan","Feb","Mar","Apr","May","Jun","Jul","Aug","Sep","Oct","Nov","Dec"), 1)}
+_LOG_NAME_DATE = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+
+def log_file_date(filename):
+    """Date d'un log archivé (AAAA-MM-JJ-N.log.gz), ou None (latest.log, nom libre)."""
+    m = _LOG_NAME_DATE.search(filename or "")
+    if m:
+        try:
+            return date(int(m[1]), int(m[2]), int(m[3]))
+        except ValueError:
+            pass
+    return None
 
-    patterns = {
-        "join":         TIME_PAT + r".*?(\w+)\s+joined the game",
-        "leave":        TIME_PAT + r".*?(\w+)\s+left the game",
-        "zombie_death": TIME_PAT + r".*?(\w+)\s+was (?:slain|killed) by (?:Zombie|zombie)",
-        "pvp_kill":     TIME_PAT + r".*?(\w+)\s+was (?:slain|killed) by (\w+)",
-        "fall_death":   TIME_PAT + r".*?(\w+)\s+(?:fell from a high place|fell off|died|hit the ground too hard|drowned|burned to death|starved to death)",
-    }
+def upload_base_date(filename, text):
+    """Date de départ des lignes Vanilla d'un fichier envoyé (`text` : son début).
 
-    MOBS = {"Zombie","Skeleton","Creeper","Spider","Witch","Enderman","Blaze","Ghast",
-            "Slime","Phantom","Drowned","Husk","Stray","Pillager","Ravager","Wither",
-            "Ender_Dragon","Vindicator","Evoker","Guardian","Shulker","Silverfish"}
+    Un log déjà suivi par le tail (reconnu à sa tête) reprend la date que le tail lui a donnée :
+    ses lignes ont alors les mêmes empreintes des deux côtés. Sinon la date du nom, sinon aujourd'hui.
+    """
+    base = ingest_state.get("tail_bases", {}).get(_log_head(text[:TAIL_HEAD].encode('utf-8')))
+    if base:
+        return date.fromisoformat(base)
+    return log_file_date(filename) or date.today()
+
+class LogClock:
+    """Date des lignes Vanilla ([HH:MM:SS]), qui n'en ont pas.
+
+    On part de `base` (voir upload_base_date ; date de départ choisie par le tail pour un
+    latest.log suivi en direct) et on avance d'un jour à chaque retour en arrière de plus d'une
+    heure (passage à minuit) ; une ligne en avance de plus de 12 h sur la dernière est une
+    retardataire de la veille.
+    """
 
-    for line in log_content.split('\n'):
+    def __init__(self, base):
+        self.base  = base
+        self.days  = 0
+        self.first = None   # secondes depuis minuit de la 1re ligne vue, pour recoller les tranches
+        self.last  = None
+
+    def observe(self, tod):
+        """Prend en compte l'heure d'une ligne ; retourne son décalage en jours depuis `base`."""
+        if self.last is None:
+            self.first = self.last = tod
+        elif tod < self.last - 3600:
+            self.days += 1
+            self.last = tod
+        elif tod > self.last + 43200:
+            return self.days - 1
+        elif tod > self.last:
+            self.last = tod
+        return self.days
+
+    def stamp(self, h, m, s, day):
+        return datetime.combine(self.base + timedelta(days=day), dt_time(h, m, s))
+
+# Règles par ordre de priorité (la première qui correspond l'emporte) :
+# (type, motif complet, littéraux dont au moins un est présent si la règle correspond)
+LOG_RULES = [
+    ("join",         r"(\w+)\s+joined the game",                           ("joined the game",)),
+    ("leave",        r"(\w+)\s+left the game",                             ("left the game",)),
+    ("zombie_death", r"(\w+)\s+was (?:slain|killed) by (?:Zombie|zombie)",  ("by Zombie", "by zombie")),
+    ("pvp_kill",     r"(\w+)\s+was (?:slain|killed) by (\w+)",              ("was slain by", "was killed by")),
+    ("fall_death",   r"(\w+)\s+(?:fell from a high place|fell off|died|hit the ground too hard|drowned|burned to death|starved to death)",
+                     ("fell", "died", "hit the ground", "drowned", "burned", "starved")),
+]
+
+# Moteur rapide : une seule alternation précompilée sur la partie fixe des messages.
+# Elle commence par \s, ce qui permet au moteur regex de sauter très vite les positions inutiles ;
+# le mot qui précède (joueur / victime) est ensuite relu à rebours par _WORD_BEFORE.
+_PHRASE_RE = re.compile(
+    r"\s(?:(?P<join>joined the game)"
+    r"|(?P<leave>left the game)"
+    r"|(?P<zombie>was (?:slain|killed) by (?:Zombie|zombie))"
+    r"|was (?:slain|killed) by (?P<killer>\w+)"
+    r"|(?P<fall>fell from a high place|fell off|died|hit the ground too hard|drowned|burned to death|starved to death))"
+)
+_PHRASE_RULE = {"join": 0, "leave": 1, "zombie": 2, "killer": 3, "fall": 4}
+_WORD_BEFORE = re.compile(r"(?:.*\W)?(\w+)\s*\Z")
+
+# Moteur exact (cinq recherches dans l'ordre), réservé aux lignes ambiguës
+_RULE_RES = [re.compile(TIME_PAT + r".*?" + pat) for _, pat, _ in LOG_RULES]
+
+# Préfiltre : une ligne sans aucun de ces littéraux ne peut correspondre à aucune règle
+_LOG_KEYWORDS = ("the game", "slain", "killed", "fell", "died", "hit the ground", "drowned", "burned", "starved")
+
+MOBS = {"Zombie","Skeleton","Creeper","Spider","Witch","Enderman","Blaze","Ghast",
+        "Slime","Phantom","Drowned","Husk","Stray","Pillager","Ravager","Wither",
+        "Ender_Dragon","Vindicator","Evoker","Guardian","Shulker","Silverfish"}
+
+def _match_line(line):
+    """Retourne (index de règle, joueur/victime, tueur ou None, horodatage) pour une ligne, ou None."""
+    pos = 0
+    while True:
+        m = _PHRASE_RE.search(line, pos)
+        if not m:
+            return None
+        w = _WORD_BEFORE.match(line, 0, m.start())
+        if w:
+            break
+        pos = m.start() + 1
+    idx = _PHRASE_RULE[m.lastgroup]
+    # Le premier message trouvé n'est le bon que si aucune règle prioritaire n'est possible
+    # ailleurs dans la ligne et que l'horodatage le précède ; sinon on passe au moteur exact.
+    t = _TIME_RE.search(line)
+    if not t:
+        return None
+    if t.end() <= w.start(1) and not any(k in line for _, _, lits in LOG_RULES[:idx] for k in lits):
+        return idx, w[1], m["killer"], t[0]
+    for i, rx in enumerate(_RULE_RES):
+        m = rx.search(line)
+        if m:
+            g = m.groups()
+            return i, g[0], g[1] if len(g) > 1 else None, t[0]
+    return None
+
+def _event_time(ts, clock, day):
+    """Texte d'horodatage → (datetime, True si la date vient de l'horloge Vanilla)."""
+    if len(ts) == 10:  # [HH:MM:SS]
+        return clock.stamp(int(ts[1:3]), int(ts[4:6]), int(ts[7:9]), day), True
+    f = _FORGE_TS.match(ts)
+    if f and f[2] in _MONTHS:
+        try:
+            return datetime(int(f[3]), _MONTHS[f[2]], int(f[1]), int(f[4]), int(f[5]), int(f[6]),
+                            int(f[7][:6].ljust(6, "0"))), False
+        except ValueError:
+            pass
+    h = re.search(r"(\d{2}):(\d{2}):(\d{2})", ts)
+    return clock.stamp(int(h[1]), int(h[2]), int(h[3]), day), True
+
+def iter_log_events(lines, clock=None):
+    """Générateur : transforme un flux de lignes en événements au fil de l'eau."""
+    for _, event, _ in iter_log_records(lines, clock):
+        yield event
+
+def iter_log_records(lines, clock=None):
+    """Comme iter_log_events, mais produit (ligne source, événement, date déduite par l'horloge ?)."""
+    if clock is None:
+        clock = LogClock(date.today())
+    keywords = _LOG_KEYWORDS
+    hhmm, day = None, 0
+    for line in lines:
+        # Toutes les lignes Vanilla font avancer l'horloge (minuit peut passer sans événement) ;
+        # on ne convertit l'heure que lorsque HH:MM change, soit rarement.
+        if line[1:6] != hhmm and line[:1] == "[" and line[3:4] == ":" and line[1:3].isdigit() and line[4:6].isdigit():
+            hhmm = line[1:6]
+            day  = clock.observe(int(hhmm[:2]) * 3600 + int(hhmm[3:]) * 60)
+        for k in keywords:
+            if k in line:
+                break
+        else:
+            continue
         line = line.strip()
-        if not line:
+        hit  = _match_line(line)
+        if not hit:
             continue
-        for etype, pat in patterns.items():
-            m = re.search(pat, line)
-            if m:
-                g = m.groups()  # groupe 0 = player/victim, groupe 1 = killer (si pvp)
-                if etype == "pvp_kill":
-                    victim = g[0]
-                    killer = g[1]
-                    if killer not in MOBS:
-                        events.append({"type": etype, "time": "00:00:00", "victim": victim, "killer": killer})
-                else:
-                    events.append({"type": etype, "time": "00:00:00", "player": g[0]})
+        idx, player, killer, ts = hit
+        etype = LOG_RULES[idx][0]
+        if etype == "pvp_kill" and killer in MOBS:
+            continue
+        when, relative = _event_time(ts, clock, day)
+        if etype == "pvp_kill":
+            yield line, {"type": etype, "time": when, "victim": player, "killer": killer}, relative
+        else:
+            yield line, {"type": etype, "time": when, "player": player}, relative
+
+def line_fingerprint(line):
+    """Empreinte 64 bits d'une ligne de log (horodatage + message)."""
+    return int.from_bytes(hashlib.blake2b(line.encode('utf-8'), digest_size=8).digest(), "big")
+
+def parse_log_records(log_content, base_date):
+    """Texte → ([(empreinte, événement, date relative ?)], horloge) ; exécuté dans les workers du pool.
+
+    Une tranche est parsée sans connaître la précédente : ses dates Vanilla partent de
+    `base_date` et sont recalées ensuite par stitch_shard grâce à (first, last, days).
+    """
+    clock   = LogClock(base_date)
+    records = [(line_fingerprint(line), ev, rel) for line, ev, rel in iter_log_records(log_content.split('\n'), clock)]
+    return records, (clock.first, clock.last, clock.days)
+
+def stitch_shard(result, state):
+    """Recale une tranche sur l'horloge de son fichier (`state` : {"days", "last"}) ; retourne [(empreinte, événement)].
+
+    L'empreinte d'une ligne Vanilla inclut sa date, sinon le même [HH:MM:SS] un autre jour
+    serait pris pour un doublon.
+    """
+    records, (first, last, days) = result
+    off = state["days"]
+    if first is not None:
+        if state["last"] is not None and first < state["last"] - 3600:
+            off += 1
+        state["days"], state["last"] = off + days, last
+    out = []
+    for fp, ev, rel in records:
+        if rel:
+            if off:
+                ev["time"] += timedelta(days=off)
+            fp = line_fingerprint(f"{fp}@{ev['time'].date().isoformat()}")
+        out.append((fp, ev))
+    return out
+
+def merge_event_streams(streams):
+    """Fusion k-voies (tas) de flux d'événements déjà triés : un seul flux chronologique."""
+    return heapq.merge(*streams, key=lambda ev: ev["time"])
+
+def spill_records(entry, records):
+    """Ajoute une tranche [(empreinte, événement)] au fichier temporaire de `entry`.
+
+    Sert quand plusieurs fichiers doivent être fusionnés : les événements attendent sur disque
+    plutôt qu'en mémoire jusqu'à la fin des téléchargements.
+    """
+    f = entry.get("spill")
+    if f is None:
+        f = entry["spill"] = tempfile.TemporaryFile()
+    # Par blocs de MERGE_BATCH_EVENTS : la relecture désérialise peu à la fois
+    n = max(1, CONFIG["MERGE_BATCH_EVENTS"])
+    for i in range(0, len(records), n):
+        pickle.dump(records[i:i + n], f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def read_spilled(entry):
+    """Relit les tranches écrites par spill_records, une à la fois."""
+    f = entry.get("spill")
+    if f is None:
+        return
+    f.seek(0)
+    while True:
+        try:
+            records = pickle.load(f)
+        except EOFError:
+            return
+        yield from records
+
+async def iter_attachment_lines(attachment, chunk_size=1 << 20, digest=None):
+    """Télécharge une pièce jointe par morceaux et produit (lignes complètes, octets lus).
+
+    Le décodage UTF-8 est incrémental et une ligne coupée entre deux morceaux est
+    reportée sur le suivant : la mémoire reste bornée à ~un morceau.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+    # Les anciens logs du dossier logs/ sont compressés (AAAA-MM-JJ-N.log.gz)
+    inflate = zlib.decompressobj(16 + zlib.MAX_WBITS) if attachment.filename.endswith(".gz") else None
+    tail = ""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(attachment.url) as resp:
+            resp.raise_for_status()
+            async for chunk in resp.content.iter_chunked(chunk_size):
+                if digest:
+                    digest.update(chunk)
+                data  = inflate.decompress(chunk) if inflate else chunk
+                lines = (tail + decoder.decode(data)).split('\n')
+                tail  = lines.pop()
+                yield lines, len(chunk)
+    tail += decoder.decode(inflate.flush() if inflate else b"", final=True)
+    if tail:
+        yield [tail], 0
+
+# ── Parsing parallèle ───────────────────────────
+
+_parse_pool = None
+
+def _parse_workers():
+    return CONFIG["PARSE_WORKERS"] or os.cpu_count() or 1
+
+def _get_parse_pool():
+    global _parse_pool
+    if _parse_pool is None:
+        # Pas de fork : le processus a déjà une boucle asyncio, des threads (to_thread, flusher) et les
+        # connexions aiohttp, un worker forké pourrait hériter d'un verrou pris et rester bloqué
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _parse_pool = ProcessPoolExecutor(max_workers=_parse_workers(), mp_context=multiprocessing.get_context(method))
+    return _parse_pool
+
+async def iter_parsed_shards(attachments, report):
+    """Parse des pièces jointes dans un pool de processus et produit ([(empreinte, événement)], octets lus, fichier).
+
+    Chaque fichier est découpé en tranches de lignes (PARSE_SHARD_MB) envoyées aux workers ;
+    les résultats sont rendus dans l'ordre d'origine (fichiers puis tranches). Le nombre de
+    tranches en vol est borné, donc la mémoire aussi, et la boucle asyncio reste libre.
+    Un fichier déjà ingéré (même clé de tête) est abandonné dès son premier morceau et
+    listé dans report["duplicates"] ; les autres vont dans report["files"]
+    ({"name", "digest", "events", "clock"}, `events` étant à incrémenter par l'appelant).
+    Les dates Vanilla d'un fichier partent de upload_base_date, calculée sur sa première tranche.
+    """
+    loop        = asyncio.get_running_loop()
+    pool        = _get_parse_pool()
+    max_pending = 2 * _parse_workers()
+    shard_size  = max(1, CONFIG["PARSE_SHARD_MB"]) * 1024 * 1024
+    pending     = collections.deque()
+    read        = 0
+    for att in attachments:
+        digest = FileDigest(att.size)
+        entry  = {"name": att.filename, "digest": digest, "events": 0, "clock": {"days": 0, "last": None}}
+        base   = None
+        buf, size, known = [], 0, None
+        async for lines, nbytes in iter_attachment_lines(att, digest=digest):
+            read += nbytes
+            if known is None and digest.head_complete():
+                known = ingested_files().get(digest.head_key(), False)
+                if known:
+                    break
+            buf.extend(lines)
+            size += nbytes
+            if size >= shard_size:
+                text = "\n".join(buf)
+                base = base or upload_base_date(att.filename, text)
+                pending.append((loop.run_in_executor(pool, parse_log_records, text, base), read, entry))
+                buf, size = [], 0
+                while len(pending) >= max_pending:
+                    fut, at, ent = pending.popleft()
+                    yield stitch_shard(await fut, ent["clock"]), at, ent
+        if known is None:  # fichier plus petit que la tête
+            known = ingested_files().get(digest.head_key(), False)
+        if known:
+            report["duplicates"].append((att.filename, known))
+            continue
+        if buf:
+            text = "\n".join(buf)
+            base = base or upload_base_date(att.filename, text)
+            pending.append((loop.run_in_executor(pool, parse_log_records, text, base), read, entry))
+        report["files"].append(entry)
+    while pending:
+        fut, at, ent = pending.popleft()
+        yield stitch_shard(await fut, ent["clock"]), at, ent
+
+# ── Registre d'ingestion (idempotence) ──────────
+
+class RollingBloom:
+    """Filtre de Bloom à deux générations : mémoire bornée, les plus vieilles empreintes expirent.
+
+    Quand la génération courante a reçu `capacity` empreintes, elle devient l'ancienne et
+    l'ancienne est jetée. Test d'appartenance et ajout en O(k), k ≈ 20.
+    """
+
+    def __init__(self, capacity, error_rate=1e-6):
+        self.capacity = max(1, capacity)
+        self.nbits    = max(64, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.k        = max(1, round(self.nbits / self.capacity * math.log(2)))
+        self.current  = bytearray(self.nbits // 8 + 1)
+        self.previous = bytearray(self.nbits // 8 + 1)
+        self.count    = 0
+        self.pending  = []   # empreintes pas encore écrites sur disque
+
+    def _positions(self, fp):
+        h1, h2 = fp & 0xFFFFFFFF, (fp >> 32) | 1
+        return [(h1 + i * h2) % self.nbits for i in range(self.k)]
+
+    def __contains__(self, fp):
+        pos = self._positions(fp)
+        for bits in (self.current, self.previous):
+            if all(bits[p >> 3] & (1 << (p & 7)) for p in pos):
+                return True
+        return False
+
+    def add(self, fp, persist=True):
+        if self.count >= self.capacity:
+            self.previous, self.current = self.current, bytearray(self.nbits // 8 + 1)
+            self.count = 0
+        for p in self._positions(fp):
+            self.current[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+        if persist:
+            self.pending.append(fp)
+
+    def take_pending(self):
+        fps, self.pending = self.pending, []
+        return fps
+
+class FileDigest:
+    """SHA-256 complet d'un fichier + clé de tête (taille + 64 Kio) connue dès le premier morceau."""
+    HEAD = 64 * 1024
+
+    def __init__(self, size):
+        self.size     = size
+        self.full     = hashlib.sha256()
+        self.head     = hashlib.sha256()
+        self.head_len = 0
+
+    def update(self, chunk):
+        self.full.update(chunk)
+        if self.head_len < self.HEAD:
+            part = chunk[:self.HEAD - self.head_len]
+            self.head.update(part)
+            self.head_len += len(part)
+
+    def head_complete(self):
+        return self.head_len >= min(self.HEAD, self.size)
+
+    def head_key(self):
+        return f"{self.size}:{self.head.hexdigest()}"
+
+ingest_ledger = RollingBloom(CONFIG["LEDGER_CAPACITY"])
+
+def _load_ledger():
+    global ingest_ledger
+    ingest_ledger = RollingBloom(CONFIG["LEDGER_CAPACITY"])
+    try:
+        with open(LEDGER_FILE, 'rb') as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return
+    n   = len(raw) // 8
+    cap = ingest_ledger.capacity
+    # Les 2 dernières générations suffisent : la plus ancienne, puis la courante
+    keep  = min(n, cap + (n % cap or cap))
+    start = (n - keep) * 8
+    for i in range(start, n * 8, 8):
+        ingest_ledger.add(int.from_bytes(raw[i:i + 8], "big"), persist=False)
+
+def _append_ledger(fps):
+    with open(LEDGER_FILE, 'ab') as f:
+        f.write(b"".join(fp.to_bytes(8, "big") for fp in fps))
+        f.flush()
+        os.fsync(f.fileno())
+    cap = max(1, CONFIG["LEDGER_CAPACITY"])
+    if os.path.getsize(LEDGER_FILE) > 3 * cap * 8:
+        # On ne garde que ce que _load_ledger relirait
+        with open(LEDGER_FILE, 'rb') as f:
+            raw = f.read()
+        tmp = f"{LEDGER_FILE}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(raw[-2 * cap * 8:])
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, LEDGER_FILE)
+
+def ingested_files():
+    return ingest_state.setdefault("files", {})
+
+def record_ingested_file(name, digest, events):
+    files = ingested_files()
+    files[digest.head_key()] = {"name": name, "sha256": digest.full.hexdigest(),
+                                "events": events, "at": datetime.now().isoformat()}
+    while len(files) > 1000:
+        del files[next(iter(files))]
+    mark_dirty("ingest", "files")
+
+def filter_new_records(records, seen, summary):
+    """Ne laisse passer que les événements jamais appliqués ; compte les doublons dans summary["dedup"].
+
+    `seen` compte les lignes identiques déjà vues dans ce flux, pour que deux lignes
+    légitimement identiques (même seconde, même message) d'un même fichier aient des empreintes
+    distinctes. Un `seen` par fichier : la même ligne dans deux fichiers (log envoyé deux fois,
+    latest.log et son archive .gz) garde la même empreinte et n'est appliquée qu'une fois.
+    """
+    for fp, event in records:
+        n = seen.get(fp, 0)
+        seen[fp] = n + 1
+        key = fp if n == 0 else line_fingerprint(f"{fp}#{n}")
+        if key in ingest_ledger:
+            summary["dedup"] += 1
+            continue
+        ingest_ledger.add(key)
+        yield event
+
+# ── Suivi en continu d'un latest.log local ──────
+
+def _tail_path():
+    path = CONFIG["TAIL_LOG_PATH"]
+    if path and os.path.isdir(path):
+        path = os.path.join(path, "latest.log")
+    return path
+
+TAIL_HEAD = 1024   # octets de tête qui identifient un log suivi (latest.log, puis son archive)
+
+def _log_head(data):
+    return hashlib.blake2b(data[:TAIL_HEAD], digest_size=16).hexdigest()
+
+def _file_head(path):
+    with open(path, 'rb') as f:
+        return _log_head(f.read(TAIL_HEAD))
+
+def _read_tail(f, offset, max_bytes, final=False):
+    """Lit les lignes complètes ajoutées après `offset` dans `f`. Retourne (lignes, nouvel offset).
+
+    `final` : le fichier ne bougera plus (rotation), sa dernière ligne est lue même sans retour à la ligne.
+    """
+    f.seek(offset)
+    data = f.read(max_bytes)
+    if final and len(data) < max_bytes:
+        return (data.decode('utf-8', errors='ignore').split('\n') if data else []), offset + len(data)
+    end = data.rfind(b"\n")
+    if end >= 0:
+        return data[:end].decode('utf-8', errors='ignore').split('\n'), offset + end + 1
+    if len(data) < max_bytes:
+        return [], offset  # ligne en cours d'écriture : on attend la suite
+    # Une seule ligne plus longue que tout le lot (trace d'erreur…) : sautée jusqu'à son retour à la ligne
+    skip = len(data)
+    while True:
+        chunk = f.read(max_bytes)
+        nl    = chunk.find(b"\n")
+        if nl >= 0:
+            return [], offset + skip + nl + 1
+        if not chunk:
+            return [], (offset + skip if final else offset)
+        skip += len(chunk)
+
+def _find_rotated(path, head):
+    """Archive de l'ancien latest.log (AAAA-MM-JJ-N.log.gz à côté), reconnue à sa tête ; ouverte, ou None."""
+    folder = os.path.dirname(path) or "."
+    try:
+        names = [os.path.join(folder, n) for n in os.listdir(folder) if n.endswith((".log.gz", ".log"))]
+    except OSError:
+        return None
+    names = [n for n in names if os.path.abspath(n) != os.path.abspath(path)]
+    for name in sorted(names, key=os.path.getmtime, reverse=True)[:5]:
+        f = gzip.open(name, 'rb') if name.endswith(".gz") else open(name, 'rb')
+        try:
+            if _log_head(f.read(TAIL_HEAD)) == head:
+                return f
+        except (OSError, EOFError):
+            pass
+        f.close()
+    return None
+
+_tail_file = None   # fichier suivi, gardé ouvert : après une rotation on peut encore en lire la fin
+TAIL_SEEN_SECONDS = 60
+
+def _tail_open(path, inode):
+    global _tail_file
+    if _tail_file is not None and os.fstat(_tail_file.fileno()).st_ino == inode:
+        return _tail_file
+    f = open(path, 'rb')
+    if os.fstat(f.fileno()).st_ino != inode:
+        f.close()   # remplacé entre stat() et open() : prochain passage
+        return None
+    if _tail_file is not None:
+        _tail_file.close()
+    _tail_file = f
+    return f
+
+def _ingest_tail(lines, state):
+    """Applique un lot de lignes du fichier suivi ; retourne `state` avec son compteur d'occurrences.
+
+    Le compteur de filter_new_records est sauvegardé avec l'offset (state["seen"] : [empreinte, n, epoch]),
+    sinon une ligne identique à une autre lue avant un redémarrage repartirait à l'occurrence 0 et serait
+    prise pour un doublon. Deux lignes identiques ont le même horodatage : seules les empreintes des
+    dernières secondes lues peuvent encore revenir, les plus anciennes sont oubliées.
+    """
+    seen    = {fp: n for fp, n, _ in state.get("seen", ())}
+    when    = {fp: t for fp, _, t in state.get("seen", ())}
+    summary = new_summary()
+    clock   = dict(state["clock"]) if "clock" in state else _tail_clock(lines)
+    records = stitch_shard(parse_log_records("\n".join(lines), date.fromisoformat(clock["base"])), clock)
+    process_events(filter_new_records(records, seen, summary), summary)
+    if summary["events"] or summary["dedup"]:
+        print(f"[Tail] {summary['events']} événements ({len(summary['kills'])} kills, {summary['dedup']} doublons)")
+    for fp, ev in records:
+        when[fp] = int(ev["time"].timestamp())
+    newest = max(when.values(), default=0)
+    return {**state, "clock": clock, "seen": [[fp, seen[fp], t] for fp, t in when.items() if t >= newest - TAIL_SEEN_SECONDS]}
+
+def _tail_clock(lines):
+    """Horloge d'un fichier suivi depuis son début : date de départ déduite de sa première ligne.
+
+    Elle vient d'être écrite : aujourd'hui, ou hier si son heure est dans le futur. Les lots
+    suivants (et un upload du même fichier, voir upload_base_date) repartent de cette date.
+    """
+    base = date.today()
+    now  = datetime.now()
+    for line in lines:
+        if line[:1] == "[" and line[3:4] == ":" and line[6:7] == ":" and line[1:3].isdigit() and line[4:6].isdigit():
+            if int(line[1:3]) * 3600 + int(line[4:6]) * 60 > now.hour * 3600 + now.minute * 60 + now.second + 300:
+                base -= timedelta(days=1)
+            break
+    return {"base": base.isoformat(), "days": 0, "last": None}
+
+def _remember_tail_base(state):
+    """Tête du fichier suivi → date de départ de son horloge (ingest_state["tail_bases"], 100 derniers)."""
+    if "head" not in state or "clock" not in state:
+        return
+    bases = ingest_state.setdefault("tail_bases", {})
+    if bases.get(state["head"]) != state["clock"]["base"]:
+        bases[state["head"]] = state["clock"]["base"]
+        while len(bases) > 100:
+            del bases[next(iter(bases))]
+        mark_dirty("ingest", "tail_bases")
+
+async def _drain_rotated(path, state):
+    """Rotation : lit la fin de l'ancien fichier (écrite depuis le dernier passage) avant de passer au nouveau.
+
+    L'ancien fichier est relu par le descripteur resté ouvert, ou, après un redémarrage, dans son
+    archive retrouvée grâce à la tête mémorisée.
+    """
+    global _tail_file
+    f = None
+    if _tail_file is not None and os.fstat(_tail_file.fileno()).st_ino == state["inode"]:
+        f, _tail_file = _tail_file, None
+    elif state.get("head"):
+        f = await asyncio.to_thread(_find_rotated, path, state["head"])
+    if f is None:
+        print(f"[Tail] Rotation de {path} : fin de l'ancien fichier introuvable")
+        return
+    try:
+        max_bytes = max(1, CONFIG["TAIL_BATCH_KB"]) * 1024
+        offset    = start = state["offset"]
+        while True:
+            lines, new = await asyncio.to_thread(_read_tail, f, offset, max_bytes, True)
+            if new == offset:
                 break
-    return events
+            offset = new
+            if lines:
+                state = _ingest_tail(lines, state)
+        print(f"[Tail] Rotation de {path} : {offset - start} octets lus en fin d'ancien fichier")
+    finally:
+        f.close()
+
+@tasks.loop(seconds=2)
+async def log_tailer():
+    # Veille peu coûteuse : un simple stat(), intervalle doublé tant que rien ne change
+    path  = _tail_path()
+    lo    = max(1, CONFIG["TAIL_POLL_MIN_SECONDS"])
+    hi    = max(lo, CONFIG["TAIL_POLL_MAX_SECONDS"])
+    delay = min(hi, log_tailer.seconds * 2)
+    if path:
+        try:
+            st    = os.stat(path)
+            state = ingest_state.get("tail", {})
+            rotated = state.get("path") != path or state.get("inode") != st.st_ino
+            if not rotated and _tail_file is None and state.get("head") and st.st_size >= TAIL_HEAD:
+                # Redémarrage : un nouveau latest.log a pu reprendre le numéro d'inode de l'ancien
+                rotated = await asyncio.to_thread(_file_head, path) != state["head"]
+            if rotated:
+                if state.get("path") == path:
+                    await _drain_rotated(path, state)
+                state = {"path": path, "inode": st.st_ino, "offset": 0}   # nouveau fichier ou rotation
+                print(f"[Tail] Suivi de {path} depuis le début")
+            elif st.st_size < state["offset"]:
+                state = {"path": path, "inode": st.st_ino, "offset": 0}   # fichier tronqué
+                print(f"[Tail] {path} tronqué, reprise au début")
+            f = await asyncio.to_thread(_tail_open, path, st.st_ino)
+            if f is not None and "head" not in state and st.st_size >= TAIL_HEAD:
+                state = {**state, "head": await asyncio.to_thread(_file_head, path)}
+            if f is not None and st.st_size > state["offset"]:
+                max_bytes = max(1, CONFIG["TAIL_BATCH_KB"]) * 1024
+                lines, offset = await asyncio.to_thread(_read_tail, f, state["offset"], max_bytes)
+                if lines:
+                    state = _ingest_tail(lines, state)
+                state = {**state, "offset": offset}
+                delay = lo
+            _remember_tail_base(state)
+            if state != ingest_state.get("tail"):
+                ingest_state["tail"] = state
+                mark_dirty("ingest", "tail")
+                save_data()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[Erreur] Tail : {e}")
+    if log_tailer.seconds != delay:
+        log_tailer.change_interval(seconds=delay)
 
 def process_kill(killer, victim, summary_kills):
     init_player(killer)
     init_player(victim)
 
-    deaths_before = player_data[killer].get("rivals", {}).get(victim, {}).get("deaths", 0)
-
     player_data[killer]["kills"]  += 1
     player_data[victim]["deaths"] += 1
     summary_kills.append(f"{killer} → {victim}")
@@ -236,8 +1989,8 @@ def process_kill(killer, victim, summary_kills):
     if killer_clan and victim_clan and killer_clan != victim_clan:
         clans[killer_clan]["points"] += CONFIG["POINTS_INTERCLAN_KILL"]
         clans[victim_clan]["points"]  = max(0, clans[victim_clan]["points"] - CONFIG["POINTS_INTERCLAN_DEATH"])
-        player_data[killer]["clan_kills"] = player_data[killer].get("clan_kills", 0) + 1
-        check_achievement(killer, "clan_warrior")
+        player_data[killer]["clan_kills"] += 1
+        mark_dirty("clans", killer_clan, victim_clan)
 
     if victim in bounties:
         b = bounties[victim]
@@ -248,34 +2001,62 @@ def process_kill(killer, victim, summary_kills):
             if killer_clan in clans:
                 clans[killer_clan]["points"] += bounty_pts
             del bounties[victim]
+            mark_dirty("clans", killer_clan)
+            mark_dirty("bounties", victim)
+            record_bounty_claim(killer)
             save_data()
-            check_achievement(killer, "bounty_hunter")
             print(f"[Bounty] {killer} ({killer_clan}) a récupéré la prime sur {victim} : +{bounty_pts} pts")
         else:
             print(f"[Bounty] Kill ignoré pour la prime : {killer} est du même clan que le proposeur ({proposer_clan})")
 
-    if player_data[killer]["kills"] == 1: check_achievement(killer, "first_blood")
-    if player_data[killer]["kills"] >= 50: check_achievement(killer, "pvp_master")
-    check_achievement(killer, "nemesis",  extra=victim)
-    if deaths_before >= 3: check_achievement(killer, "comeback", extra=victim)
+def new_summary():
+    return {"events": 0, "dedup": 0, "joins": [], "kills": [], "deaths": [], "zombie_deaths": [], "sessions": []}
+
+def playtime_from_logs():
+    return CONFIG["PLAYTIME_SOURCE"] == "logs"
+
+def process_events(events, summary=None):
+    """Applique des événements (liste ou générateur, dans l'ordre chronologique) ; cumule dans `summary` si fourni.
 
-def process_events(events):
-    summary = {"joins": [], "kills": [], "deaths": [], "zombie_deaths": []}
+    Chaque join ouvre une session (gardée dans ingest_state pour survivre à un redémarrage
+    ou à un log coupé en deux) que le leave suivant ferme avec sa durée exacte.
+    """
+    if summary is None:
+        summary = new_summary()
+    sessions = ingest_state.setdefault("sessions", {})
     for event in events:
+        summary["events"] += 1
         if event["type"] == "join":
-            summary["joins"].append(event["player"])
+            p = event["player"]
+            summary["joins"].append(p)
+            sessions[p] = event["time"].isoformat()
+            mark_dirty("ingest", "sessions")
+        elif event["type"] == "leave":
+            p     = event["player"]
+            start = sessions.pop(event["player"], None)
+            if start is None:
+                continue
+            mark_dirty("ingest", "sessions")
+            mins = (event["time"] - datetime.fromisoformat(start)).total_seconds() / 60
+            if mins < 0:
+                continue
+            summary["sessions"].append((p, mins))
+            if playtime_from_logs():
+                update_playtime(p, mins, when=event["time"])
         elif event["type"] == "pvp_kill":
             process_kill(event["killer"], event["victim"], summary["kills"])
         elif event["type"] == "zombie_death":
             p = event["player"]; init_player(p)
             player_data[p]["deaths"]      += 1
-            player_data[p]["zombie_kills"] = player_data[p].get("zombie_kills", 0) + 1
+            player_data[p]["zombie_kills"] += 1
+            mark_dirty("players", p)
             summary["zombie_deaths"].append(p)
-            if player_data[p]["zombie_kills"] >= 100: check_achievement(p, "zombie_hunter")
         elif event["type"] == "fall_death":
             p = event["player"]; init_player(p)
             player_data[p]["deaths"] += 1
+            mark_dirty("players", p)
             summary["deaths"].append(p)
+    achievement_engine.commit()
     save_data()
     return summary
 
@@ -283,56 +2064,355 @@ def process_events(events):
 #  SERVEUR MC — ASYNC
 # ══════════════════════════════════════════════
 
-import asyncio
-
-async def check_server_status():
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, _check_server_status_sync)
-
-def _check_server_status_sync():
-    try:
-        server = JavaServer.lookup(SERVER_ADDRESS, timeout=3)
-        status = server.status()
-
-        # Aternos en veille repond avec 0/0 -> hors ligne
-        if status.players.max == 0:
+_probe_times    = collections.deque()   # instants des sondes réseau (dernière heure)
+_probe_slots    = (0, None)             # (taille, sémaphore) bornant les sondes simultanées
+_SAMPLE_NAME    = re.compile(r"\w{3,16}")
+_NULL_UUID      = "00000000-0000-0000-0000-000000000000"
+_CHANNEL_KEYS   = {"announce": "ANNOUNCEMENT_CHANNEL_ID", "logs": "LOGS_CHANNEL_ID"}
+
+monitored = {}   # clé du registre → MonitoredServer (état en mémoire, non persisté)
+
+def _sample_names(status):
+    # L'échantillon du status peut contenir des lignes de texte décoratives (uuid nul)
+    return [p.name for p in (status.players.sample or [])
+            if p.id != _NULL_UUID and _SAMPLE_NAME.fullmatch(p.name)]
+
+def _probe_semaphore():
+    global _probe_slots
+    size = max(1, CONFIG["PROBE_CONCURRENCY"])
+    if _probe_slots[0] != size:
+        _probe_slots = (size, asyncio.Semaphore(size))
+    return _probe_slots[1]
+
+def probe_rate():
+    """Nombre de sondes réseau sur la dernière heure (tous serveurs confondus)."""
+    limit = time.monotonic() - 3600
+    while _probe_times and _probe_times[0] < limit:
+        _probe_times.popleft()
+    return len(_probe_times)
+
+class MonitoredServer:
+    """Un serveur du registre : résolution en cache, sonde partagée, dernier état et sessions en cours."""
+
+    def __init__(self, key):
+        self.key        = key
+        self.mc_server  = None
+        self.expires    = 0.0   # fin de validité de mc_server (résolution SRV/DNS en cache)
+        self.cache      = {"at": 0.0, "result": None}
+        self.probe_task = None
+        self.query      = {"ok": None, "checked": 0.0}   # ok : None = inconnu, False = port query fermé
+        self.previous   = None  # dernier état connu (en ligne ?)
+        self.sessions   = {}    # joueur → début de session
+
+    @property
+    def conf(self):
+        return servers[self.key]
+
+    @property
+    def name(self):
+        return self.conf["name"]
+
+    def channel_id(self, kind):
+        """Salon "announce" ou "logs" de ce serveur, sinon celui de la config globale (0 = aucun)."""
+        return self.conf.get(f"{kind}_channel") or CONFIG[_CHANNEL_KEYS[kind]]
+
+    async def check_status(self, max_age=None):
+        """Statut du serveur, partagé par /status et server_monitor.
+
+        Un résultat de moins de `max_age` secondes (STATUS_CACHE_SECONDS par défaut) est
+        réutilisé, et les appels simultanés attendent la même sonde au lieu d'en lancer une chacun.
+        """
+        if max_age is None:
+            max_age = CONFIG["STATUS_CACHE_SECONDS"]
+        if self.cache["result"] is not None and time.monotonic() - self.cache["at"] < max_age:
+            return self.cache["result"]
+        if self.probe_task is None or self.probe_task.done():
+            self.probe_task = asyncio.ensure_future(self._probe())
+        # shield : un appelant annulé n'annule pas la sonde des autres
+        return await asyncio.shield(self.probe_task)
+
+    async def _probe(self):
+        async with _probe_semaphore():
+            _probe_times.append(time.monotonic())
+            result = await self._probe_async()
+        self.cache.update(at=time.monotonic(), result=result)
+        if self.previous is not None and result["online"] != self.previous:
+            wake_monitor()
+        return result
+
+    async def _resolve(self, timeout):
+        # La recherche SRV/DNS n'est refaite qu'à expiration, ou après un échec
+        if self.mc_server is None or time.monotonic() >= self.expires:
+            self.mc_server = await JavaServer.async_lookup(self.conf["address"], timeout=timeout)
+            self.expires   = time.monotonic() + max(0, CONFIG["DNS_CACHE_SECONDS"])
+        return self.mc_server
+
+    def forget_address(self):
+        self.mc_server = None
+
+    def _query_wanted(self):
+        if self.query["ok"] is not False:
+            return True
+        return time.monotonic() - self.query["checked"] >= CONFIG["QUERY_RECHECK_MINUTES"] * 60
+
+    def _set_query_support(self, ok):
+        if ok != self.query["ok"]:
+            print(f"[MC] {self.name} : query disponible" if ok else
+                  f"[MC] {self.name} : query indisponible, repli sur l'échantillon du status")
+        self.query.update(ok=ok, checked=time.monotonic())
+
+    async def _probe_async(self):
+        """Sonde asynchrone : status (TCP) et query (UDP) en parallèle, sous un délai global.
+
+        Rien ne passe par le pool de threads, et un serveur en veille ne coûte pas deux
+        délais d'attente à la suite : tout ce qui dépasse PROBE_TIMEOUT_SECONDS est annulé.
+        """
+        loop     = asyncio.get_running_loop()
+        timeout  = max(1, CONFIG["PROBE_TIMEOUT_SECONDS"])
+        deadline = loop.time() + timeout
+        query_t  = None
+        try:
+            async with asyncio.timeout_at(deadline):
+                server  = await self._resolve(timeout)
+                if self._query_wanted():
+                    query_t = asyncio.create_task(server.async_query())
+                status  = await server.async_status()
+
+            # Aternos en veille repond avec 0/0 -> hors ligne
+            if status.players.max == 0:
+                return {"online": False, "player_list": []}
+
+            # La query a eu jusqu'ici pour répondre ; elle garde le reste du délai global
+            player_list, source = None, "sample"
+            if query_t is not None:
+                done, _ = await asyncio.wait({query_t}, timeout=max(0, deadline - loop.time()))
+                ok = query_t in done and query_t.exception() is None
+                self._set_query_support(ok)
+                if ok:
+                    player_list, source = query_t.result().players.names or [], "query"
+            if player_list is None:
+                player_list = _sample_names(status)
+
+            return {
+                "online": True,
+                "players": status.players.online,
+                "max_players": status.players.max,
+                "player_list": player_list,
+                "player_source": source,
+                # L'échantillon est limité (~12 noms) : une liste incomplète ne prouve pas un départ
+                "complete": len(player_list) >= status.players.online,
+            }
+        except Exception as e:
+            self.mc_server = None   # l'adresse a peut-être changé : nouvelle résolution à la prochaine sonde
+            print(f"[MC] {self.name} injoignable : {e!r}")
             return {"online": False, "player_list": []}
-
+        finally:
+            if query_t is not None:
+                if not query_t.done():
+                    query_t.cancel()
+                elif not query_t.cancelled():
+                    query_t.exception()   # consommée : pas d'avertissement "never retrieved"
+
+    def close_sessions(self):
+        """Termine les sessions en cours (serveur éteint ou retiré du registre)."""
+        if not playtime_from_logs():
+            for p, t in self.sessions.items():
+                update_playtime(p, (datetime.now() - t).total_seconds() / 60)
+        self.sessions.clear()
+
+def sync_monitored():
+    """Aligne les états en mémoire sur le registre ; crée l'entrée par défaut si le registre est vide."""
+    if not servers:
+        servers["main"] = {"address": SERVER_ADDRESS, "name": SERVER_DISPLAY_NAME,
+                           "announce_channel": 0, "logs_channel": 0}
+        mark_dirty("servers", "main")
+    for key in list(monitored):
+        if key not in servers:
+            monitored.pop(key).close_sessions()
+    # Ordre stable (par clé) pour /status et /servers, quel que soit l'ordre de rechargement
+    states = {key: monitored.get(key) or MonitoredServer(key) for key in sorted(servers)}
+    monitored.clear()
+    monitored.update(states)
+
+# ── Index pseudo MC → membre Discord ────────────
+
+_member_index = {}   # guild_id → {pseudo normalisé: {member_id}}
+_member_keys  = {}   # guild_id → {member_id: pseudos sous lesquels il est indexé}
+_role_ids     = {}   # guild_id → id du rôle actif
+
+def _norm_name(name):
+    return name.casefold()
+
+def _member_names(member):
+    return {_norm_name(n) for n in (member.nick, member.name, member.display_name) if n}
+
+def _unindex_member(guild_id, member_id):
+    idx = _member_index.get(guild_id)
+    if idx is None:
+        return
+    for n in _member_keys[guild_id].pop(member_id, ()):
+        ids = idx.get(n)
+        if ids:
+            ids.discard(member_id)
+            if not ids:
+                del idx[n]
+
+def index_member(member):
+    """(Ré)indexe un membre ; sans effet tant que l'index de sa guilde n'est pas construit."""
+    gid = member.guild.id
+    if gid not in _member_index:
+        return
+    _unindex_member(gid, member.id)
+    names = _member_names(member)
+    for n in names:
+        _member_index[gid].setdefault(n, set()).add(member.id)
+    _member_keys[gid][member.id] = names
+
+def _guild_member_index(guild):
+    # Construit une seule fois par guilde, puis tenu à jour par les événements membres
+    if guild.id not in _member_index:
+        _member_index[guild.id] = {}
+        _member_keys[guild.id]  = {}
+        for member in guild.members:
+            index_member(member)
+    return _member_index[guild.id]
+
+def find_member(guild, player_name):
+    """Membre dont le pseudo, le nom ou le surnom correspond au joueur MC (O(1))."""
+    for mid in sorted(_guild_member_index(guild).get(_norm_name(player_name), ())):
+        member = guild.get_member(mid)
+        if member:
+            return member
+    return None
+
+def drop_guild_index(guild_id):
+    _member_index.pop(guild_id, None)
+    _member_keys.pop(guild_id, None)
+    _role_ids.pop(guild_id, None)
+
+def find_active_role(guild):
+    """Rôle actif de la guilde (id en cache) ou None s'il n'existe pas."""
+    role_name = CONFIG["ACTIVE_ROLE_NAME"]
+    role = guild.get_role(_role_ids.get(guild.id, 0))
+    if not role or role.name != role_name:
+        role = discord.utils.get(guild.roles, name=role_name)
+        if not role:
+            return None
+        _role_ids[guild.id] = role.id
+    return role
+
+async def active_role(guild):
+    """Comme find_active_role, mais crée le rôle s'il n'existe pas encore."""
+    role = find_active_role(guild)
+    if not role:
         try:
-            query       = server.query()
-            player_list = query.players.names if query.players.names else []
-        except:
-            player_list = []
-
-        return {
-            "online": True,
-            "players": status.players.online,
-            "max_players": status.players.max,
-            "player_list": player_list
-        }
-    except Exception as e:
-        print(f"[MC] Serveur injoignable : {e}")
-        return {"online": False, "player_list": []}
+            role = await guild.create_role(name=CONFIG["ACTIVE_ROLE_NAME"], color=discord.Color.gold(), reason="Rôle auto MC")
+        except Exception as e:
+            print(f"[Erreur] Création rôle : {e}"); return None
+        _role_ids[guild.id] = role.id
+    return role
 
 async def check_and_give_role(guild, player_name):
     if player_name not in player_data: return
     if player_data[player_name]["total_minutes"] / 60 < CONFIG["HOURS_FOR_ACTIVE_ROLE"]: return
-    role_name = CONFIG["ACTIVE_ROLE_NAME"]
-    role = discord.utils.get(guild.roles, name=role_name)
-    if not role:
+    role = await active_role(guild)
+    if not role: return
+    member = find_member(guild, player_name)
+    if member and role not in member.roles:
         try:
-            role = await guild.create_role(name=role_name, color=discord.Color.gold(), reason="Rôle auto MC")
+            await member.add_roles(role)
+            print(f"[Rôle] {player_name} → '{role.name}'")
         except Exception as e:
-            print(f"[Erreur] Création rôle : {e}"); return
-    for member in guild.members:
-        if member.nick == player_name or member.name == player_name or member.display_name == player_name:
-            if role not in member.roles:
-                try:
-                    await member.add_roles(role)
-                    print(f"[Rôle] {player_name} → '{role_name}'")
-                except Exception as e:
-                    print(f"[Erreur] Ajout rôle : {e}")
-            break
+            print(f"[Erreur] Ajout rôle : {e}")
+
+# ── Réconciliation du rôle actif ────────────────
+
+role_sync_stats = {}   # métriques du dernier passage (affichées par /syncroles)
+_role_sync_lock = asyncio.Lock()
+
+def role_plan(guild, role):
+    """(à ajouter, à retirer) : membres dont le rôle actif ne correspond pas à leurs heures de jeu.
+
+    Le rôle n'est retiré qu'aux membres reliés à un joueur connu passé sous le seuil :
+    un rôle donné à la main à quelqu'un qui ne joue pas reste en place.
+    """
+    want = {}
+    for name, _ in ranking("playtime").at_least(CONFIG["HOURS_FOR_ACTIVE_ROLE"] * 60):
+        member = find_member(guild, name)
+        if member:
+            want[member.id] = member
+    holders = {m.id: m for m in role.members} if role else {}
+    add     = [m for mid, m in want.items() if mid not in holders]
+    extra   = [m for mid, m in holders.items() if mid not in want]
+    if not extra:
+        return add, []
+    known = {_norm_name(p) for p in player_data}
+    return add, [m for m in extra if _member_names(m) & known]
+
+async def _role_call(op, member, role, stats):
+    # Quelques essais avec attente croissante ; la limite de débit (429) est déjà gérée par discord.py
+    for attempt in range(3):
+        stats["api_calls"] += 1
+        try:
+            if op == "add":
+                await member.add_roles(role, reason="Réconciliation rôle actif")
+            else:
+                await member.remove_roles(role, reason="Réconciliation rôle actif")
+            return True
+        except (discord.NotFound, discord.Forbidden) as e:
+            print(f"[Erreur] Rôle {member} : {e}"); return False
+        except discord.HTTPException as e:
+            print(f"[Rôle] Échec ({e}), nouvel essai dans {2 ** attempt}s")
+            await asyncio.sleep(2 ** attempt)
+    return False
+
+async def reconcile_roles():
+    """Aligne le rôle actif sur les heures de jeu dans chaque guilde ; retourne les métriques.
+
+    Seules les différences donnent lieu à des appels API, espacés selon ROLE_SYNC_PER_SECOND.
+    Sans différence, aucun appel n'est fait. Retourne None si une réconciliation tourne déjà.
+    """
+    if _role_sync_lock.locked():
+        return None
+    async with _role_sync_lock:
+        t0    = time.perf_counter()
+        stats = {"added": 0, "removed": 0, "failed": 0, "api_calls": 0}
+        queue = collections.deque()
+        for guild in bot.guilds:
+            role = find_active_role(guild)
+            add, remove = role_plan(guild, role)
+            if add and not role:
+                stats["api_calls"] += 1
+                role = await active_role(guild)
+                if not role:
+                    continue
+            queue.extend(("add", m, role) for m in add)
+            queue.extend(("remove", m, role) for m in remove)
+        pause = 1 / max(0.1, CONFIG["ROLE_SYNC_PER_SECOND"])
+        while queue:
+            op, member, role = queue.popleft()
+            if await _role_call(op, member, role, stats):
+                stats["added" if op == "add" else "removed"] += 1
+            else:
+                stats["failed"] += 1
+            if queue:
+                await asyncio.sleep(pause)
+        stats["changes"] = stats["added"] + stats["removed"]
+        stats["seconds"] = time.perf_counter() - t0
+        stats["at"]      = datetime.now().isoformat()
+        role_sync_stats.clear()
+        role_sync_stats.update(stats)
+        if stats["api_calls"]:
+            print(f"[Rôle] Réconciliation : +{stats['added']} / -{stats['removed']}, {stats['failed']} échecs, "
+                  f"{stats['api_calls']} appels API en {stats['seconds']:.1f}s")
+        return stats
+
+@tasks.loop(minutes=15)
+async def role_reconciler():
+    await reconcile_roles()
+    interval = max(1, CONFIG["ROLE_SYNC_MINUTES"])
+    if role_reconciler.minutes != interval:
+        role_reconciler.change_interval(minutes=interval)
 
 # ══════════════════════════════════════════════
 #  EVENTS BOT
@@ -341,55 +2421,206 @@ async def check_and_give_role(guild, player_name):
 @bot.event
 async def on_ready():
     print(f"[Bot] {bot.user} connecté")
-    load_data()
+    if not persistence_flusher.is_running():
+        # Une seule fois : après une reconnexion, la mémoire contient des modifs pas encore écrites
+        load_data()
+        persistence_flusher.start()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.ensure_future(bot.close()))
+        except (NotImplementedError, RuntimeError):
+            pass
     synced = await tree.sync()
     print(f"[Bot] {len(synced)} commandes synchronisées")
-    server_monitor.start()
+    if not server_monitor.is_running():
+        server_monitor.start()
+    if not log_tailer.is_running():
+        log_tailer.start()
+    if not outbox_sender.is_running():
+        outbox_sender.start()
+    if not role_reconciler.is_running():
+        role_reconciler.start()   # premier passage immédiat
+
+@bot.event
+async def on_member_join(member):
+    index_member(member)
 
-@tasks.loop(minutes=3)
+@bot.event
+async def on_member_remove(member):
+    _unindex_member(member.guild.id, member.id)
+
+@bot.event
+async def on_member_update(before, after):
+    if _member_names(before) != _member_names(after):
+        index_member(after)
+
+@bot.event
+async def on_user_update(before, after):
+    # Changement de nom d'utilisateur : touche toutes les guildes partagées
+    if before.name != after.name or before.global_name != after.global_name:
+        for guild in after.mutual_guilds:
+            member = guild.get_member(after.id)
+            if member:
+                index_member(member)
+
+@bot.event
+async def on_guild_role_delete(role):
+    if _role_ids.get(role.guild.id) == role.id:
+        del _role_ids[role.guild.id]
+
+@bot.event
+async def on_guild_role_update(before, after):
+    if before.name != after.name and _role_ids.get(after.guild.id) == after.id:
+        del _role_ids[after.guild.id]
+
+@bot.event
+async def on_guild_remove(guild):
+    drop_guild_index(guild.id)
+
+_monitor_busy = False
+
+def _monitor_bounds():
+    lo = max(5, CONFIG["MONITOR_MIN_SECONDS"])
+    return lo, max(lo, CONFIG["MONITOR_MAX_SECONDS"])
+
+def wake_monitor():
+    """Sonde au plus tôt : un changement d'état a été vu ailleurs (par /status)."""
+    server_monitor.change_interval(seconds=_monitor_bounds()[0])
+    if server_monitor.is_running() and not _monitor_busy:
+        server_monitor.restart()   # il dormait : on coupe l'attente, la sonde en cache sera réutilisée
+
+@tasks.loop(seconds=30)
 async def server_monitor():
-    global previous_status, current_session_players
-    s = await check_server_status()
+    # Sondage adaptatif : rapide si un serveur est en ligne ou change d'état, recul exponentiel sinon
+    global _monitor_busy
+    _monitor_busy = True
+    try:
+        changed = await _monitor_tick()
+    finally:
+        _monitor_busy = False
+    lo, hi = _monitor_bounds()
+    online = any(srv.previous for srv in monitored.values())
+    delay  = lo if online or changed else min(hi, server_monitor.seconds * 2)
+    if delay != server_monitor.seconds:
+        server_monitor.change_interval(seconds=delay)
+        print(f"[MC] Sondage toutes les {delay:.0f}s ({probe_rate()} sondes sur la dernière heure)")
+
+async def _monitor_tick():
+    """Sonde tous les serveurs en parallèle (bornés par PROBE_CONCURRENCY) ; True si un état a changé."""
+    srvs    = list(monitored.values())
+    results = await asyncio.gather(*(srv.check_status() for srv in srvs))
+    changed = False
+    for srv, s in zip(srvs, results):
+        changed |= _apply_status(srv, s)
+    _update_presence()
+    return changed
+
+def _update_presence():
+    global _presence_wanted
+    srvs = list(monitored.values())
+    if len(srvs) == 1:
+        s = srvs[0].cache["result"]
+        _presence_wanted = f"🟢 {s['players']}/{s['max_players']} joueurs" if s and s["online"] else "🔴 Serveur hors ligne"
+        return
+    up = [srv.cache["result"] for srv in srvs if srv.previous]
+    if up:
+        _presence_wanted = f"🟢 {sum(s['players'] for s in up)} joueurs • {len(up)}/{len(srvs)} serveurs"
+    else:
+        _presence_wanted = "🔴 Serveurs hors ligne"
+
+def _apply_status(srv, s):
+    """Sessions, salons et annonces d'un serveur après une sonde ; True si son état a changé.
+
+    Rien n'est envoyé ici : tout passe par la file de notifications (outbox_sender).
+    """
     online = s["online"]
+    where  = f" sur **{srv.name}**" if len(monitored) > 1 else ""
 
     if online:
-        await bot.change_presence(activity=discord.Game(name=f"🟢 {s['players']}/{s['max_players']} joueurs"))
         for p in s["player_list"]:
-            if p not in current_session_players:
-                current_session_players[p] = datetime.now()
-                ch_id = CONFIG["LOGS_CHANNEL_ID"]
-                if ch_id:
-                    ch = bot.get_channel(ch_id)
-                    if ch: await ch.send(f"🟢 **{p}** s'est connecté")
-        for p in list(current_session_players):
-            if p not in s["player_list"]:
-                mins = (datetime.now() - current_session_players[p]).total_seconds() / 60
-                update_playtime(p, mins)
-                del current_session_players[p]
-                ch_id = CONFIG["LOGS_CHANNEL_ID"]
-                if ch_id:
-                    ch = bot.get_channel(ch_id)
-                    if ch: await ch.send(f"🔴 **{p}** déconnecté ({int(mins)} min)")
-                for guild in bot.guilds:
-                    await check_and_give_role(guild, p)
+            if p not in srv.sessions:
+                srv.sessions[p] = datetime.now()
+                notify(srv.channel_id("logs"), f"🟢 **{p}** s'est connecté{where}")
+        for p in list(srv.sessions):
+            if p not in s["player_list"] and s["complete"]:
+                mins = (datetime.now() - srv.sessions[p]).total_seconds() / 60
+                if not playtime_from_logs():
+                    update_playtime(p, mins)
+                del srv.sessions[p]
+                notify(srv.channel_id("logs"), f"🔴 **{p}** déconnecté{where} ({int(mins)} min)")
+                _role_checks.add(p)
     else:
-        await bot.change_presence(activity=discord.Game(name="🔴 Serveur hors ligne"))
-        for p, t in current_session_players.items():
-            update_playtime(p, (datetime.now() - t).total_seconds() / 60)
-        current_session_players.clear()
-
-    if previous_status != online:
-        ch_id = CONFIG["ANNOUNCEMENT_CHANNEL_ID"]
-        if ch_id:
-            ch = bot.get_channel(ch_id)
-            if ch:
-                if online:
-                    e = discord.Embed(title="🟢 Serveur en ligne !", description=f"**{SERVER_DISPLAY_NAME}** est accessible !", color=discord.Color.green())
-                    await ch.send("@everyone", embed=e)
-                else:
-                    e = discord.Embed(title="🔴 Serveur hors ligne", description=f"**{SERVER_DISPLAY_NAME}** est hors ligne.", color=discord.Color.red())
-                    await ch.send(embed=e)
-    previous_status = online
+        srv.close_sessions()
+
+    changed = srv.previous != online
+    if changed:
+        if online:
+            e = discord.Embed(title="🟢 Serveur en ligne !", description=f"**{srv.name}** est accessible !", color=discord.Color.green())
+            announce(srv.channel_id("announce"), e, "@everyone")
+        else:
+            e = discord.Embed(title="🔴 Serveur hors ligne", description=f"**{srv.name}** est hors ligne.", color=discord.Color.red())
+            announce(srv.channel_id("announce"), e)
+    srv.previous = online
+    return changed
+
+# ── File de notifications ───────────────────────
+
+_outbox_lines    = {}                   # salon → lignes en attente, fusionnées en un récapitulatif
+_outbox_embeds   = collections.deque()  # (salon, contenu, embed) : annonces, dans l'ordre
+_role_checks     = set()                # joueurs déconnectés dont le rôle actif est à vérifier
+_presence_wanted = None
+_presence_sent   = None
+
+def notify(ch_id, line):
+    if ch_id:
+        _outbox_lines.setdefault(ch_id, []).append(line)
+
+def announce(ch_id, embed, content=None):
+    if ch_id:
+        _outbox_embeds.append((ch_id, content, embed))
+
+def _chunk_lines(lines, limit=2000):
+    # Un message Discord fait au plus 2000 caractères
+    chunk, size = [], 0
+    for line in lines:
+        if chunk and size + len(line) + 1 > limit:
+            yield "\n".join(chunk)
+            chunk, size = [], 0
+        chunk.append(line[:limit])
+        size += len(line) + 1
+    if chunk:
+        yield "\n".join(chunk)
+
+async def _send(ch_id, content=None, embed=None):
+    ch = bot.get_channel(ch_id)
+    if not ch:
+        return
+    try:
+        await ch.send(content, embed=embed)
+    except discord.HTTPException as e:
+        print(f"[Erreur] Envoi dans {ch_id} : {e}")
+
+@tasks.loop(seconds=2)
+async def outbox_sender():
+    # Tâche de fond : le moniteur ne fait que remplir la file et n'attend jamais Discord
+    global _presence_sent
+    while _outbox_embeds:
+        await _send(*_outbox_embeds.popleft())
+    if _outbox_lines:
+        batches = dict(_outbox_lines)
+        _outbox_lines.clear()
+        for ch_id, lines in batches.items():
+            for chunk in _chunk_lines(lines):
+                await _send(ch_id, chunk)
+    if _presence_wanted is not None and _presence_wanted != _presence_sent:
+        text = _presence_wanted
+        await bot.change_presence(activity=discord.Game(name=text))
+        _presence_sent = text
+    if _role_checks:
+        players = sorted(_role_checks)
+        _role_checks.clear()
+        for p in players:
+            for guild in bot.guilds:
+                await check_and_give_role(guild, p)
 
 async def owner_check(interaction) -> bool:
     if interaction.user.id != OWNER_ID:
@@ -404,59 +2635,90 @@ def is_clan_leader(player_name, clan_name):
 #  ═══════ COMMANDES SLASH ═══════
 # ══════════════════════════════════════════════
 
-@tree.command(name="status", description="Statut du serveur Minecraft")
-async def slash_status(interaction: discord.Interaction):
+@tree.command(name="status", description="Statut des serveurs Minecraft")
+async def slash_status(interaction: discord.Interaction, serveur: str = None):
     await interaction.response.defer()
-    s = await check_server_status()
-    if s["online"]:
-        e = discord.Embed(title=f"🎮 {SERVER_DISPLAY_NAME}", description="🟢 En ligne", color=discord.Color.green())
-    else:
-        e = discord.Embed(title=f"🎮 {SERVER_DISPLAY_NAME}", description="🔴 Hors ligne", color=discord.Color.red())
-    await interaction.followup.send(embed=e)
+    if serveur and serveur not in monitored:
+        await interaction.followup.send(f"❌ Serveur **{serveur}** inconnu (voir /servers)"); return
+    srvs    = [monitored[serveur]] if serveur else list(monitored.values())[:10]
+    results = await asyncio.gather(*(srv.check_status() for srv in srvs))
+    embeds  = []
+    for srv, s in zip(srvs, results):
+        if s["online"]:
+            e = discord.Embed(title=f"🎮 {srv.name}", description="🟢 En ligne", color=discord.Color.green())
+            names = ", ".join(s["player_list"]) or "—"
+            e.add_field(name=f"👥 Joueurs ({s['players']}/{s['max_players']})", value=names[:1024], inline=False)
+            source = "query" if s["player_source"] == "query" else "échantillon du status (peut être partielle)"
+            e.set_footer(text=f"Liste : {source} • {probe_rate()} sondes/h")
+        else:
+            e = discord.Embed(title=f"🎮 {srv.name}", description="🔴 Hors ligne", color=discord.Color.red())
+            e.set_footer(text=f"Prochaine sonde dans ≤ {server_monitor.seconds:.0f}s • {probe_rate()} sondes/h")
+        embeds.append(e)
+    await interaction.followup.send(embeds=embeds)
+
+@tree.command(name="servers", description="Serveurs Minecraft surveillés")
+async def slash_servers(interaction: discord.Interaction):
+    e = discord.Embed(title="🗺️ Serveurs surveillés", color=discord.Color.blurple())
+    for key, srv in monitored.items():
+        state = {True: "🟢 En ligne", False: "🔴 Hors ligne"}.get(srv.previous, "⏳ Pas encore sondé")
+        e.add_field(name=f"{srv.name} (`{key}`)", value=f"{srv.conf['address']}\n{state} • 👥 {len(srv.sessions)}", inline=True)
+    await interaction.response.send_message(embed=e)
 
 @tree.command(name="stats", description="Stats complètes d'un joueur")
 async def slash_stats(interaction: discord.Interaction, joueur: str):
     await interaction.response.defer()
     if joueur not in player_data:
         await interaction.followup.send(f"❌ Aucune donnée pour **{joueur}**"); return
-    d     = player_data[joueur]
+    deps = (("players", joueur), ("clan_members", joueur), ("bounties", joueur))
+    await db_sync()
+    await interaction.followup.send(embeds=render_cache.get(("stats", joueur), deps, lambda: _render_stats(joueur)))
+
+def _stats_view(joueur):
+    """(fiche, clan, prime, top victimes, top tueurs) : requêtes par clé en mode sqlite, sinon la mémoire."""
+    if STORAGE_MODE == "sqlite":
+        return db_stats(joueur)
+    d, names = player_data[joueur], name_table.names
+    return (d, clan_members.get(joueur), bounties.get(joueur),
+            [(names[o], n) for o, n in rivalries.top_victims(d.id)],
+            [(names[o], n) for o, n in rivalries.top_killers(d.id)])
+
+def _render_stats(joueur):
+    d, clan, b, tk, td = _stats_view(joueur)
     hours = d["total_minutes"] / 60
     ratio = d["kills"] / d["deaths"] if d["deaths"] > 0 else float(d["kills"])
 
     e = discord.Embed(title=f"📊 Stats de {joueur}", color=discord.Color.blue())
     e.add_field(name="⏱️ Temps de jeu",      value=f"{hours:.1f}h",                   inline=True)
     e.add_field(name="🎮 Sessions",           value=str(d["sessions"]),                inline=True)
-    e.add_field(name="🛡️ Clan",              value=clan_members.get(joueur,"Aucun"),  inline=True)
+    e.add_field(name="🛡️ Clan",              value=clan or "Aucun",                   inline=True)
     e.add_field(name="⚔️ Kills PvP",         value=str(d["kills"]),                   inline=True)
     e.add_field(name="☠️ Morts",             value=str(d["deaths"]),                  inline=True)
     e.add_field(name="📊 K/D",               value=f"{ratio:.2f}",                   inline=True)
     e.add_field(name="🧟 Zombies",           value=str(d.get("zombie_kills",0)),      inline=True)
     e.add_field(name="🛡️ Kills inter-clan", value=str(d.get("clan_kills",0)),        inline=True)
 
-    if joueur in bounties:
-        b = bounties[joueur]
+    if b:
         e.add_field(name="💰 Prime active !", value=f"{b['points']} pts — posée par [{b['proposer_clan']}]", inline=False)
 
-    rivals = d.get("rivals", {})
-    if rivals:
-        tk = sorted([(r,v) for r,v in rivals.items() if v["kills"]>0],  key=lambda x:x[1]["kills"],  reverse=True)[:3]
-        td = sorted([(r,v) for r,v in rivals.items() if v["deaths"]>0], key=lambda x:x[1]["deaths"], reverse=True)[:3]
-        if tk: e.add_field(name="🔪 Victimes préférées",    value="\n".join([f"**{r}** : {v['kills']}x"  for r,v in tk]), inline=True)
-        if td: e.add_field(name="😵 Te tue le plus souvent",value="\n".join([f"**{r}** : {v['deaths']}x" for r,v in td]), inline=True)
+    if tk: e.add_field(name="🔪 Victimes préférées",    value="\n".join([f"**{o}** : {n}x" for o,n in tk]), inline=True)
+    if td: e.add_field(name="😵 Te tue le plus souvent",value="\n".join([f"**{o}** : {n}x" for o,n in td]), inline=True)
 
     achs = d.get("achievements", [])
     if achs:
         e.add_field(name=f"🏆 Achievements ({len(achs)})", value="\n".join([ACHIEVEMENTS[a]["name"] for a in achs if a in ACHIEVEMENTS]), inline=False)
-    await interaction.followup.send(embed=e)
+    return [e]
 
 @tree.command(name="rivalry", description="Historique de kills entre deux joueurs")
 async def slash_rivalry(interaction: discord.Interaction, joueur1: str, joueur2: str):
     await interaction.response.defer()
     if joueur1 not in player_data or joueur2 not in player_data:
         await interaction.followup.send("❌ L'un des deux joueurs n'a pas de données"); return
-    r1 = player_data[joueur1].get("rivals", {}).get(joueur2, {"kills":0,"deaths":0})
-    r2 = player_data[joueur2].get("rivals", {}).get(joueur1, {"kills":0,"deaths":0})
-    j1k = r1["kills"]; j2k = r2["kills"]; total = j1k + j2k
+    await db_sync()
+    if STORAGE_MODE == "sqlite":
+        j1k, j2k = db_rivalry(joueur1, joueur2)
+    else:
+        j1k, j2k = player_data[joueur1].rival(joueur2)
+    total = j1k + j2k
 
     e = discord.Embed(title=f"⚔️ {joueur1} vs {joueur2}", color=discord.Color.red())
     if total > 0:
@@ -479,8 +2741,7 @@ async def slash_myrivalry(interaction: discord.Interaction, adversaire: str):
         await interaction.followup.send(f"❌ Aucune donnée pour toi ({joueur})"); return
     if adversaire not in player_data:
         await interaction.followup.send(f"❌ **{adversaire}** n'a pas de données"); return
-    r = player_data[joueur].get("rivals",{}).get(adversaire,{"kills":0,"deaths":0})
-    k = r["kills"]; d = r["deaths"]; total = k+d
+    k, d  = player_data[joueur].rival(adversaire); total = k+d
     ratio = k/d if d>0 else float(k)
     if k>d:   desc, color = f"✅ Tu **domines** {adversaire} !", discord.Color.green()
     elif d>k: desc, color = f"❌ **{adversaire}** te domine...", discord.Color.red()
@@ -492,31 +2753,205 @@ async def slash_myrivalry(interaction: discord.Interaction, adversaire: str):
     e.add_field(name="🎯 Total affrontements",      value=str(total),     inline=True)
     await interaction.followup.send(embed=e)
 
+@tree.command(name="toprivalries", description="Les rivalités les plus disputées du serveur")
+async def slash_toprivalries(interaction: discord.Interaction):
+    await interaction.response.defer()
+    if not len(ranking("rivalries")):
+        await interaction.followup.send("❌ Aucune rivalité enregistrée"); return
+    await send_board(interaction, "rivalries")
+
+# ── CLASSEMENTS PAGINÉS ──
+# Chaque page est lue dans l'index de classement (tranche O(page)), rendue via render_cache
+# et affichée dans un seul message édité sur place par les boutons.
+
+def _medal(rank):
+    return ["🥇","🥈","🥉"][rank-1] if rank<=3 else f"{rank}."
+
+def _clan_tag(player):
+    return f" [{clan_members[player]}]" if player in clan_members else ""
+
+def _row_pvp(rank, player, k):
+    dth=player_data[player].get("deaths",0); ratio=k/dth if dth>0 else float(k)
+    return f"{_medal(rank)} {player}{_clan_tag(player)}", f"💀 {k} kills • ☠️ {dth} morts • K/D: {ratio:.2f}"
+
+def _row_top(rank, player, mins):
+    return f"{_medal(rank)} {player}{_clan_tag(player)}", f"⏱️ {mins/60:.1f}h • 🎮 {player_data[player]['sessions']} sessions"
+
+def _row_clan(rank, name, points):
+    return f"{_medal(rank)} {name}", f"👑 {clans[name]['leader']} • 👥 {member_count(name)} membres • ⭐ {points} pts"
+
+def _row_rivalry(rank, key, total):
+    a, b   = RivalryGraph.ends(key)
+    ab, ba = rivalries.pair(a, b)
+    na, nb = name_table.names[a], name_table.names[b]
+    return f"{_medal(rank)} {na} ⚔️ {nb}", f"🎯 {total} affrontements • {na} **{ab}** – **{ba}** {nb}"
+
+def _line_player(rank, name, mins):
+    d = player_data[name]
+    return f"`{rank}.` **{name}** | {mins/60:.1f}h | {d['kills']}K/{d['deaths']}D | [{clan_members.get(name,'-')}]"
+
+def _clan_points_help():
+    return f"Points : inter-clan kill +{CONFIG['POINTS_INTERCLAN_KILL']}/-{CONFIG['POINTS_INTERCLAN_DEATH']} | {CONFIG['POINTS_PER_HOUR']}pt/h | achievements | bounties"
+
+BOARDS = {
+    "pvp":       {"index": "kills",       "size": 10, "deps": ("players", "clan_members"),
+                  "title": "⚔️ Classement PvP",           "color": discord.Color.red,      "row": _row_pvp},
+    "top":       {"index": "playtime",    "size": 10, "deps": ("players", "clan_members"),
+                  "title": "⏱️ Classement Temps de Jeu",  "color": discord.Color.blurple,  "row": _row_top},
+    "clans":     {"index": "clan_points", "size": 10, "deps": ("clans", "clan_members", "config"),
+                  "title": "🛡️ Classement des Clans",     "color": discord.Color.gold,     "row": _row_clan,
+                  "footer": _clan_points_help},
+    "rivalries": {"index": "rivalries",   "size": 10, "deps": ("players",),
+                  "title": "🔥 Plus grandes rivalités",   "color": discord.Color.dark_red, "row": _row_rivalry},
+    "players":   {"index": "playtime",    "size": 20, "deps": ("players", "clan_members"),
+                  "title": "👥 Joueurs enregistrés",      "color": discord.Color.blurple,  "row": _line_player,
+                  "lines": True},
+}
+
+def board_pages(board):
+    spec = BOARDS[board]
+    return max(1, -(-len(board_index(spec["index"])) // spec["size"]))
+
+def render_board(board, page):
+    """Embeds de la page `page` (0 = première) du classement `board`."""
+    spec = BOARDS[board]
+    return render_cache.get((board, page), spec["deps"], lambda: _render_board_page(board, page),
+                            ttl=CONFIG["PAGE_CACHE_SECONDS"])
+
+def _render_board_page(board, page):
+    spec  = BOARDS[board]
+    idx   = board_index(spec["index"])
+    size  = spec["size"]
+    first = page*size
+    rows  = [spec["row"](first+i+1, name, score) for i,(name,score) in enumerate(idx.page(first, size))]
+    e = discord.Embed(title=spec["title"], color=spec["color"]())
+    if spec.get("lines"):
+        e.description = "\n".join(rows)
+    else:
+        for name, value in rows:
+            e.add_field(name=name, value=value, inline=False)
+    footer = f"Page {page+1}/{board_pages(board)} • {len(idx)} classés"
+    if "footer" in spec:
+        footer += f" | {spec['footer']()}"
+    e.set_footer(text=footer)
+    return [e]
+
+class JumpToRankModal(discord.ui.Modal, title="Aller au rang"):
+    cible = discord.ui.TextInput(label="Rang ou pseudo", placeholder="ex : 150 ou Steve", max_length=32)
+
+    def __init__(self, board_view):
+        super().__init__()
+        self.board_view = board_view
+
+    async def on_submit(self, interaction: discord.Interaction):
+        spec   = BOARDS[self.board_view.board]
+        target = self.cible.value.strip()
+        await db_sync()
+        rank   = int(target) if target.isdigit() else board_index(spec["index"]).rank(target)
+        if not rank:
+            await interaction.response.send_message(f"❌ **{target}** n'est pas dans ce classement", ephemeral=True); return
+        await self.board_view.show(interaction, (rank-1) // spec["size"])
+
+class BoardView(discord.ui.View):
+    """Navigation dans un classement : ⏮️ ◀️ ▶️ ⏭️ et saut direct à un rang, un seul message édité."""
+
+    def __init__(self, board, owner_id, page=0):
+        super().__init__(timeout=300)
+        self.board    = board
+        self.owner_id = owner_id
+        self.page     = page
+        self.message  = None
+
+    def embeds(self):
+        pages     = board_pages(self.board)
+        self.page = min(max(0, self.page), pages-1)
+        self.first_page.disabled = self.prev_page.disabled = self.page == 0
+        self.next_page.disabled  = self.last_page.disabled = self.page >= pages-1
+        return render_board(self.board, self.page)
+
+    async def show(self, interaction, page):
+        self.page = page
+        await db_sync()
+        await interaction.response.edit_message(embeds=self.embeds(), view=self)
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id == self.owner_id:
+            return True
+        await interaction.response.send_message("❌ Lance la commande toi-même pour naviguer dans ce classement", ephemeral=True)
+        return False
+
+    async def on_timeout(self):
+        if self.message:
+            try: await self.message.edit(view=None)
+            except discord.HTTPException: pass
+
+    @discord.ui.button(emoji="⏮️", style=discord.ButtonStyle.secondary)
+    async def first_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, 0)
+
+    @discord.ui.button(emoji="◀️", style=discord.ButtonStyle.secondary)
+    async def prev_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, self.page-1)
+
+    @discord.ui.button(emoji="▶️", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, self.page+1)
+
+    @discord.ui.button(emoji="⏭️", style=discord.ButtonStyle.secondary)
+    async def last_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, board_pages(self.board)-1)
+
+    @discord.ui.button(label="Aller au rang", emoji="🔎", style=discord.ButtonStyle.primary)
+    async def jump(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.send_modal(JumpToRankModal(self))
+
+async def send_board(interaction, board, ephemeral=False):
+    """Envoie la première page ; les boutons ne sont ajoutés que s'il y a plusieurs pages."""
+    await db_sync()
+    view   = BoardView(board, interaction.user.id)
+    kwargs = {"embeds": view.embeds(), "ephemeral": ephemeral}
+    paged  = board_pages(board) > 1
+    if paged:
+        kwargs["view"] = view
+    if interaction.response.is_done():
+        msg = await interaction.followup.send(wait=True, **kwargs)
+    else:
+        await interaction.response.send_message(**kwargs)
+        msg = await interaction.original_response() if paged else None
+    view.message = msg
+
 @tree.command(name="pvpleaderboard", description="Classement PvP")
 async def slash_pvpleaderboard(interaction: discord.Interaction):
     await interaction.response.defer()
-    pvp = sorted([(n,d) for n,d in player_data.items() if d.get("kills",0)>0], key=lambda x:x[1]["kills"], reverse=True)
-    if not pvp:
+    await db_sync()
+    if not len(board_index("kills")):
         await interaction.followup.send("❌ Aucune donnée PvP"); return
-    e = discord.Embed(title="⚔️ Classement PvP", color=discord.Color.red())
-    for i,(player,d) in enumerate(pvp[:10]):
-        k=d.get("kills",0); dth=d.get("deaths",0); ratio=k/dth if dth>0 else float(k)
-        tag=f" [{clan_members[player]}]" if player in clan_members else ""
-        medal=["🥇","🥈","🥉"][i] if i<3 else f"{i+1}."
-        e.add_field(name=f"{medal} {player}{tag}", value=f"💀 {k} kills • ☠️ {dth} morts • K/D: {ratio:.2f}", inline=False)
-    await interaction.followup.send(embed=e)
+    await send_board(interaction, "pvp")
 
 @tree.command(name="top", description="Classement par temps de jeu")
 async def slash_top(interaction: discord.Interaction):
     await interaction.response.defer()
     if not player_data:
         await interaction.followup.send("❌ Aucune donnée"); return
-    sp = sorted(player_data.items(), key=lambda x:x[1]["total_minutes"], reverse=True)
-    e  = discord.Embed(title="⏱️ Classement Temps de Jeu", color=discord.Color.blurple())
-    for i,(player,d) in enumerate(sp[:10]):
-        h=d["total_minutes"]/60; tag=f" [{clan_members[player]}]" if player in clan_members else ""
-        medal=["🥇","🥈","🥉"][i] if i<3 else f"{i+1}."
-        e.add_field(name=f"{medal} {player}{tag}", value=f"⏱️ {h:.1f}h • 🎮 {d['sessions']} sessions", inline=False)
+    await send_board(interaction, "top")
+
+@tree.command(name="rank", description="Position d'un joueur dans chaque classement")
+async def slash_rank(interaction: discord.Interaction, joueur: str):
+    await interaction.response.defer()
+    if joueur not in player_data:
+        await interaction.followup.send(f"❌ Aucune donnée pour **{joueur}**"); return
+    d = player_data[joueur]
+    await db_sync()
+    def pos(name, key):
+        idx = board_index(name); r = idx.rank(key)
+        return f"#{r} / {len(idx)}" if r else "—"
+    e = discord.Embed(title=f"🏅 Classements de {joueur}", color=discord.Color.blurple())
+    e.add_field(name="⏱️ Temps de jeu", value=f"{pos('playtime', joueur)}\n{d['total_minutes']/60:.1f}h",   inline=True)
+    e.add_field(name="⚔️ Kills PvP",    value=f"{pos('kills', joueur)}\n{d.get('kills',0)} kills",         inline=True)
+    e.add_field(name="📊 K/D",          value=f"{pos('kd', joueur)}\n{kd_ratio(d):.2f}",                   inline=True)
+    if joueur in clan_members:
+        cn = clan_members[joueur]
+        e.add_field(name=f"🛡️ Clan {cn}", value=pos("clan_points", cn), inline=True)
     await interaction.followup.send(embed=e)
 
 # ── BOUNTIES (PRIMES) ─────────────────────────
@@ -559,6 +2994,8 @@ async def slash_bounty(interaction: discord.Interaction, cible: str, points: int
         "points":        points,
         "created":       datetime.now().isoformat(),
     }
+    mark_dirty("clans", clan_name)
+    mark_dirty("bounties", cible)
     save_data()
 
     e = discord.Embed(title="💰 Prime posée !", color=discord.Color.gold())
@@ -590,7 +3027,9 @@ async def slash_cancelbounty(interaction: discord.Interaction, cible: str):
     clan = b["proposer_clan"]
     if clan in clans:
         clans[clan]["points"] += pts
+        mark_dirty("clans", clan)
     del bounties[cible]
+    mark_dirty("bounties", cible)
     save_data()
 
     await interaction.followup.send(f"✅ Prime sur **{cible}** annulée. **{pts} pts** rendus au clan **{clan}**.")
@@ -600,6 +3039,9 @@ async def slash_bounties(interaction: discord.Interaction):
     await interaction.response.defer()
     if not bounties:
         await interaction.followup.send("✅ Aucune prime active en ce moment"); return
+    await interaction.followup.send(embeds=render_cache.get(("bounties",), ("bounties",), _render_bounties))
+
+def _render_bounties():
     e = discord.Embed(title="💰 Primes Actives", color=discord.Color.gold())
     for target, b in bounties.items():
         created = datetime.fromisoformat(b["created"]).strftime("%d/%m %H:%M")
@@ -609,7 +3051,7 @@ async def slash_bounties(interaction: discord.Interaction):
             inline=False
         )
     e.set_footer(text="⚠️ Un membre du clan proposeur ne peut pas récupérer sa propre prime")
-    await interaction.followup.send(embed=e)
+    return [e]
 
 # ── CLANS ─────────────────────────────────────
 
@@ -625,6 +3067,8 @@ async def slash_createclan(interaction: discord.Interaction, nom: str):
         await interaction.followup.send(f"❌ Nom max {CONFIG['MAX_CLAN_NAME_LENGTH']} caractères"); return
     clans[nom] = {"leader": pn, "created": datetime.now().isoformat(), "points": 0}
     clan_members[pn] = nom
+    mark_dirty("clans", nom)
+    mark_dirty("clan_members", pn)
     save_data()
     e = discord.Embed(title=f"🛡️ Clan créé : {nom}", color=discord.Color.green())
     e.add_field(name="👑 Chef", value=pn, inline=True)
@@ -640,8 +3084,9 @@ async def slash_joinclan(interaction: discord.Interaction, nom: str):
     if nom not in clans:
         await interaction.followup.send(f"❌ Le clan **{nom}** n'existe pas"); return
     clan_members[pn] = nom
+    mark_dirty("clan_members", pn)
     save_data()
-    count = len([p for p,c in clan_members.items() if c==nom])
+    count = member_count(nom)
     await interaction.followup.send(f"✅ Tu as rejoint **{nom}** ! ({count} membres au total)")
 
 
@@ -654,14 +3099,15 @@ async def slash_leaveclan(interaction: discord.Interaction):
         await interaction.followup.send("❌ Tu n'es dans aucun clan"); return
     cn = clan_members[pn]
     if clans[cn]["leader"] == pn:
-        others = [p for p,c in clan_members.items() if c==cn and p!=pn]
-        if others:
+        if member_count(cn) > 1:
             await interaction.followup.send("❌ Tu es chef ! Utilise `/transferleader` d'abord."); return
-        for target, b in list(bounties.items()):
-            if b["proposer_clan"] == cn:
-                del bounties[target]
+        for target, _ in bounties_of(cn):
+            del bounties[target]
+            mark_dirty("bounties", target)
         del clans[cn]
+        mark_dirty("clans", cn)
     del clan_members[pn]
+    mark_dirty("clan_members", pn)
     save_data()
     await interaction.followup.send(f"✅ Tu as quitté **{cn}**")
 
@@ -679,6 +3125,7 @@ async def slash_transferleader(interaction: discord.Interaction, nouveau_chef: s
     if nouveau_chef == pn:
         await interaction.followup.send("❌ Tu es déjà le chef !"); return
     clans[cn]["leader"] = nouveau_chef
+    mark_dirty("clans", cn)
     save_data()
     e = discord.Embed(title="👑 Leadership transféré", color=discord.Color.gold())
     e.add_field(name="Clan",         value=cn,           inline=True)
@@ -691,19 +3138,22 @@ async def slash_claninfo(interaction: discord.Interaction, nom: str):
     await interaction.response.defer()
     if nom not in clans:
         await interaction.followup.send(f"❌ Le clan **{nom}** n'existe pas"); return
-    clan    = clans[nom]
-    members = [p for p,c in clan_members.items() if c==nom]
+    await db_sync()
+    if STORAGE_MODE == "sqlite":
+        clan, roster, active_bounties = db_clan(nom)
+    else:
+        clan   = clans[nom]
+        roster = [(m, player_data[m]["kills"] if m in player_data else 0) for m in members_of(nom)]
+        active_bounties = bounties_of(nom)
     created = datetime.fromisoformat(clan["created"])
-    active_bounties = [(t,b) for t,b in bounties.items() if b["proposer_clan"]==nom]
     e = discord.Embed(title=f"🛡️ {nom}", color=discord.Color.gold())
     e.add_field(name="👑 Chef",    value=clan["leader"],               inline=True)
     e.add_field(name="⭐ Points",  value=str(clan["points"]),          inline=True)
-    e.add_field(name="👥 Membres", value=str(len(members)),            inline=True)
+    e.add_field(name="👥 Membres", value=str(len(roster)),             inline=True)
     e.add_field(name="📅 Créé le", value=created.strftime("%d/%m/%Y"),inline=True)
-    if members:
+    if roster:
         lines=[]
-        for m in members:
-            k = player_data.get(m,{}).get("kills",0)
+        for m, k in roster:
             crown = "👑 " if m==clan["leader"] else "   "
             lines.append(f"{crown}**{m}** — {k} kills")
         e.add_field(name="📋 Membres", value="\n".join(lines), inline=False)
@@ -718,14 +3168,7 @@ async def slash_clanleaderboard(interaction: discord.Interaction):
     await interaction.response.defer()
     if not clans:
         await interaction.followup.send("❌ Aucun clan créé"); return
-    sc = sorted(clans.items(), key=lambda x:x[1]["points"], reverse=True)
-    e  = discord.Embed(title="🛡️ Classement des Clans", color=discord.Color.gold())
-    e.set_footer(text=f"Points : inter-clan kill +{CONFIG['POINTS_INTERCLAN_KILL']}/-{CONFIG['POINTS_INTERCLAN_DEATH']} | {CONFIG['POINTS_PER_HOUR']}pt/h | achievements | bounties")
-    for i,(name,data) in enumerate(sc[:10]):
-        members=len([p for p,c in clan_members.items() if c==name])
-        medal=["🥇","🥈","🥉"][i] if i<3 else f"{i+1}."
-        e.add_field(name=f"{medal} {name}", value=f"👑 {data['leader']} • 👥 {members} membres • ⭐ {data['points']} pts", inline=False)
-    await interaction.followup.send(embed=e)
+    await send_board(interaction, "clans")
 
 @tree.command(name="setupclan", description="Créer un clan complet d'un coup : nom, chef et membres (proprio)")
 async def slash_setupclan(
@@ -771,7 +3214,9 @@ async def slash_setupclan(
     for m in membre_list:
         init_player(m)
         clan_members[m] = nom
+        mark_dirty("clan_members", m)
         added.append(m)
+    mark_dirty("clans", nom)
 
     save_data()
 
@@ -784,19 +3229,76 @@ async def slash_setupclan(
     await interaction.followup.send(embed=e, ephemeral=True)
 
 
-@tree.command(name="uploadlogs", description="Uploader un fichier .log du serveur (proprio)")
-async def slash_uploadlogs(interaction: discord.Interaction, fichier: discord.Attachment):
+@tree.command(name="uploadlogs", description="Uploader un ou plusieurs fichiers .log du serveur (proprio)")
+async def slash_uploadlogs(
+    interaction: discord.Interaction,
+    fichier:   discord.Attachment,
+    fichier2:  discord.Attachment = None,
+    fichier3:  discord.Attachment = None,
+    fichier4:  discord.Attachment = None,
+    fichier5:  discord.Attachment = None,
+    fichier6:  discord.Attachment = None,
+    fichier7:  discord.Attachment = None,
+    fichier8:  discord.Attachment = None,
+    fichier9:  discord.Attachment = None,
+    fichier10: discord.Attachment = None,
+):
     if not await owner_check(interaction): return
     await interaction.response.defer()
-    if not fichier.filename.endswith(('.log','.txt')):
-        await interaction.followup.send("❌ Fichier .log ou .txt uniquement"); return
+    fichiers = [f for f in (fichier, fichier2, fichier3, fichier4, fichier5,
+                            fichier6, fichier7, fichier8, fichier9, fichier10) if f]
+    bad = [f.filename for f in fichiers if not f.filename.endswith(('.log', '.txt', '.log.gz'))]
+    if bad:
+        await interaction.followup.send(f"❌ Fichier .log, .log.gz ou .txt uniquement ({', '.join(bad)})"); return
     try:
-        log_text = (await fichier.read()).decode('utf-8', errors='ignore')
-        events   = parse_minecraft_logs(log_text)
-        summary  = process_events(events)
+        names     = ", ".join(f"**{f.filename}**" for f in fichiers)
+        total     = sum(f.size for f in fichiers)
+        progress  = await interaction.followup.send(f"⏳ Analyse de {names}…", wait=True)
+        step      = max(1, CONFIG["UPLOAD_PROGRESS_MB"]) * 1024 * 1024
+        summary   = new_summary()
+        report    = {"files": [], "duplicates": []}
+        next_tick = step
+        # Un seul fichier : déjà chronologique, chaque tranche part directement au traitement
+        # (mémoire bornée aux tranches en vol). Plusieurs fichiers : chaque fichier est écrit
+        # dans un fichier temporaire, puis la fusion k-voies les relit en parallèle ; en mémoire,
+        # une tranche (PARSE_SHARD_MB de log) par fichier, sur disque, tous leurs événements.
+        spill = len(fichiers) > 1
+        try:
+            async for records, read, entry in iter_parsed_shards(fichiers, report):
+                entry["events"] += len(records)
+                if spill:
+                    await asyncio.to_thread(spill_records, entry, records)
+                else:
+                    process_events(filter_new_records(records, entry.setdefault("seen", {}), summary), summary)
+                if read >= next_tick:
+                    next_tick = read + step
+                    pct = f" ({read * 100 // total}%)" if total else ""
+                    await progress.edit(content=f"⏳ Analyse de {names} : {read // (1024 * 1024)} Mo lus{pct}…")
+            if spill:
+                # Dédoublonnage par fichier, puis un seul flux ordonné, appliqué par lots : entre deux
+                # lots la boucle reprend la main (autres commandes, moniteur)
+                streams = [filter_new_records(read_spilled(entry), {}, summary) for entry in report["files"]]
+                merged  = merge_event_streams(streams)
+                batch   = max(1, CONFIG["MERGE_BATCH_EVENTS"])
+                while True:
+                    events = list(itertools.islice(merged, batch))
+                    if not events:
+                        break
+                    process_events(events, summary)
+                    await asyncio.sleep(0)
+        finally:
+            for entry in report["files"]:
+                if entry.get("spill"):
+                    entry.pop("spill").close()
+        for entry in report["files"]:
+            record_ingested_file(entry["name"], entry["digest"], entry["events"])
+        save_data()
         e = discord.Embed(title="📊 Logs analysés", color=discord.Color.blue())
-        e.add_field(name="📋 Événements", value=str(len(events)),                  inline=True)
+        e.add_field(name="📁 Fichiers",   value=str(len(fichiers)),                inline=True)
+        e.add_field(name="📋 Événements", value=str(summary["events"]),            inline=True)
+        e.add_field(name="♻️ Doublons ignorés", value=str(summary["dedup"] + sum(k["events"] for _, k in report["duplicates"])), inline=True)
         e.add_field(name="🔌 Connexions", value=str(len(summary["joins"])),        inline=True)
+        e.add_field(name="⏱️ Sessions",   value=f"{len(summary['sessions'])} ({sum(m for _, m in summary['sessions']) / 60:.1f}h)", inline=True)
         e.add_field(name="⚔️ Kills PvP",  value=str(len(summary["kills"])),        inline=True)
         e.add_field(name="☠️ Morts",      value=str(len(summary["deaths"])),       inline=True)
         e.add_field(name="🧟 Zombies",    value=str(len(summary["zombie_deaths"])),inline=True)
@@ -804,18 +3306,73 @@ async def slash_uploadlogs(interaction: discord.Interaction, fichier: discord.At
             txt="\n".join(summary["kills"][:10])
             if len(summary["kills"])>10: txt+=f"\n*...et {len(summary['kills'])-10} autres*"
             e.add_field(name="🔪 Kills détectés", value=txt, inline=False)
-        await interaction.followup.send(embed=e)
+        if report["duplicates"]:
+            dup = "\n".join(f"**{n}** (déjà importé comme {k['name']})" for n, k in report["duplicates"])
+            e.add_field(name="♻️ Fichiers déjà ingérés", value=dup[:1024], inline=False)
+        await progress.edit(content=None, embed=e)
     except Exception as ex:
         await interaction.followup.send(f"❌ Erreur : {ex}")
 
 @tree.command(name="config", description="Voir la configuration actuelle du bot (proprio)")
 async def slash_config(interaction: discord.Interaction):
     if not await owner_check(interaction): return
-    e = discord.Embed(title="⚙️ Configuration du Bot", color=discord.Color.blurple())
-    for key, val in CONFIG.items():
-        e.add_field(name=key, value=str(val), inline=True)
-    e.set_footer(text="Modifie avec /setconfig <clé> <valeur>")
-    await interaction.response.send_message(embed=e, ephemeral=True)
+    items  = list(CONFIG.items())
+    embeds = []
+    for i in range(0, len(items), 24):   # 25 champs max par embed
+        e = discord.Embed(title="⚙️ Configuration du Bot" if i == 0 else None, color=discord.Color.blurple())
+        for key, val in items[i:i+24]:
+            e.add_field(name=key, value=str(val), inline=True)
+        embeds.append(e)
+    embeds[-1].set_footer(text=f"Modifie avec /setconfig <clé> <valeur> • cache d'affichage : {render_cache.hits} hits / {render_cache.misses} miss")
+    await interaction.response.send_message(embeds=embeds, ephemeral=True)
+
+@tree.command(name="flush", description="Forcer l'écriture des données sur le disque (proprio)")
+async def slash_flush(interaction: discord.Interaction):
+    if not await owner_check(interaction): return
+    await interaction.response.defer(ephemeral=True)
+    t0 = time.perf_counter()
+    n  = await flush_data()
+    ms = (time.perf_counter() - t0) * 1000
+    await interaction.followup.send(f"✅ Données écrites ({n} entrées, {ms:.0f} ms)", ephemeral=True)
+
+@tree.command(name="addserver", description="Ajouter ou modifier un serveur surveillé (proprio)")
+async def slash_addserver(
+    interaction: discord.Interaction,
+    cle: str,
+    adresse: str,
+    nom: str,
+    salon_annonces: discord.TextChannel = None,
+    salon_logs: discord.TextChannel = None,
+):
+    if not await owner_check(interaction): return
+    old = servers.get(cle)
+    servers[cle] = {
+        "address":          adresse,
+        "name":             nom,
+        "announce_channel": salon_annonces.id if salon_annonces else (old or {}).get("announce_channel", 0),
+        "logs_channel":     salon_logs.id if salon_logs else (old or {}).get("logs_channel", 0),
+    }
+    mark_dirty("servers", cle)
+    save_data()
+    sync_monitored()
+    if old and old["address"] != adresse:
+        monitored[cle].forget_address()
+    wake_monitor()
+    verb = "modifié" if old else "ajouté"
+    await interaction.response.send_message(f"✅ Serveur **{nom}** (`{cle}`, {adresse}) {verb}", ephemeral=True)
+
+@tree.command(name="removeserver", description="Ne plus surveiller un serveur (proprio)")
+async def slash_removeserver(interaction: discord.Interaction, cle: str):
+    if not await owner_check(interaction): return
+    if cle not in servers:
+        await interaction.response.send_message(f"❌ Serveur **{cle}** inconnu", ephemeral=True); return
+    if len(servers) == 1:
+        await interaction.response.send_message("❌ Impossible de retirer le dernier serveur", ephemeral=True); return
+    name = servers.pop(cle)["name"]
+    mark_dirty("servers", cle)
+    sync_monitored()   # clôt les sessions en cours sur ce serveur
+    save_data()
+    await interaction.response.send_message(f"✅ **{name}** (`{cle}`) n'est plus surveillé", ephemeral=True)
 
 @tree.command(name="setconfig", description="Modifier un paramètre du bot (proprio)")
 async def slash_setconfig(interaction: discord.Interaction, cle: str, valeur: str):
@@ -827,6 +3384,7 @@ async def slash_setconfig(interaction: discord.Interaction, cle: str, valeur: st
         if isinstance(old, int):     CONFIG[cle] = int(valeur)
         elif isinstance(old, float): CONFIG[cle] = float(valeur)
         else:                        CONFIG[cle] = valeur
+        mark_dirty("config", cle)
         save_data()
         await interaction.response.send_message(f"✅ **{cle}** : `{old}` → `{CONFIG[cle]}`", ephemeral=True)
     except ValueError:
@@ -837,17 +3395,7 @@ async def slash_listplayers(interaction: discord.Interaction):
     if not await owner_check(interaction): return
     if not player_data:
         await interaction.response.send_message("❌ Aucun joueur enregistré", ephemeral=True); return
-    sp = sorted(player_data.items(), key=lambda x:x[1]["total_minutes"], reverse=True)
-    lines=[]
-    for name, d in sp:
-        h    = d["total_minutes"]/60
-        clan = clan_members.get(name,"-")
-        lines.append(f"**{name}** | {h:.1f}h | {d['kills']}K/{d['deaths']}D | [{clan}]")
-    chunks = [lines[i:i+20] for i in range(0, len(lines), 20)]
-    for i, chunk in enumerate(chunks):
-        e = discord.Embed(title=f"👥 Joueurs enregistrés ({i+1}/{len(chunks)})", color=discord.Color.blurple())
-        e.description = "\n".join(chunk)
-        await interaction.response.send_message(embed=e, ephemeral=True) if i==0 else await interaction.followup.send(embed=e, ephemeral=True)
+    await send_board(interaction, "players", ephemeral=True)
 
 @tree.command(name="setpoints", description="Définir exactement les points d'un clan (proprio)")
 async def slash_setpoints(interaction: discord.Interaction, clan: str, points: int):
@@ -856,6 +3404,7 @@ async def slash_setpoints(interaction: discord.Interaction, clan: str, points: i
         await interaction.response.send_message("❌ Ce clan n'existe pas", ephemeral=True); return
     old = clans[clan]["points"]
     clans[clan]["points"] = max(0, points)
+    mark_dirty("clans", clan)
     save_data()
     await interaction.response.send_message(f"✅ Points de **{clan}** : {old} → {clans[clan]['points']}", ephemeral=True)
 
@@ -866,6 +3415,7 @@ async def slash_addpoints(interaction: discord.Interaction, clan: str, points: i
         await interaction.response.send_message("❌ Ce clan n'existe pas", ephemeral=True); return
     old = clans[clan]["points"]
     clans[clan]["points"] = max(0, old + points)
+    mark_dirty("clans", clan)
     save_data()
     action = "ajoutés à" if points>=0 else "retirés de"
     await interaction.response.send_message(f"✅ **{abs(points)}** pts {action} **{clan}** : {old} → {clans[clan]['points']}", ephemeral=True)
@@ -878,12 +3428,13 @@ async def slash_renameclan(interaction: discord.Interaction, ancien: str, nouvea
     if nouveau in clans:
         await interaction.response.send_message("❌ Ce nouveau nom existe déjà", ephemeral=True); return
     clans[nouveau] = clans.pop(ancien)
-    for p in clan_members:
-        if clan_members[p] == ancien:
-            clan_members[p] = nouveau
-    for t in bounties:
-        if bounties[t]["proposer_clan"] == ancien:
-            bounties[t]["proposer_clan"] = nouveau
+    mark_dirty("clans", ancien, nouveau)
+    for p in members_of(ancien):
+        clan_members[p] = nouveau
+        mark_dirty("clan_members", p)
+    for t, b in bounties_of(ancien):
+        b["proposer_clan"] = nouveau
+        mark_dirty("bounties", t)
     save_data()
     await interaction.response.send_message(f"✅ Clan renommé : **{ancien}** → **{nouveau}**", ephemeral=True)
 
@@ -899,7 +3450,8 @@ async def slash_givekill(interaction: discord.Interaction, killer: str, victim:
     if killer_clan and victim_clan and killer_clan != victim_clan:
         clans[killer_clan]["points"] += CONFIG["POINTS_INTERCLAN_KILL"]
         clans[victim_clan]["points"]  = max(0, clans[victim_clan]["points"] - CONFIG["POINTS_INTERCLAN_DEATH"])
-        player_data[killer]["clan_kills"] = player_data[killer].get("clan_kills",0)+1
+        player_data[killer]["clan_kills"] += 1
+        mark_dirty("clans", killer_clan, victim_clan)
     bonus = ""
     if victim in bounties:
         b=bounties[victim]
@@ -907,6 +3459,11 @@ async def slash_givekill(interaction: discord.Interaction, killer: str, victim:
             clans[killer_clan]["points"] += b["points"]
             bonus = f" + **{b['points']}** pts de prime récupérée !"
             del bounties[victim]
+            mark_dirty("clans", killer_clan)
+            mark_dirty("bounties", victim)
+            record_bounty_claim(killer)
+    mark_dirty("players", killer, victim)
+    achievement_engine.commit()
     save_data()
     await interaction.response.send_message(f"✅ Kill enregistré : **{killer}** → **{victim}**{bonus}", ephemeral=True)
 
@@ -916,9 +3473,23 @@ async def slash_addtime(interaction: discord.Interaction, joueur: str, minutes:
     init_player(joueur)
     old = player_data[joueur]["total_minutes"]
     player_data[joueur]["total_minutes"] += minutes
+    mark_dirty("players", joueur)
+    achievement_engine.commit()
     save_data()
     h_old = old/60; h_new = (old+minutes)/60
     await interaction.response.send_message(f"✅ **{joueur}** : {h_old:.1f}h → {h_new:.1f}h (+{minutes} min)", ephemeral=True)
+    await reconcile_roles()
+
+@tree.command(name="syncroles", description="Réconcilier le rôle actif maintenant (proprio)")
+async def slash_syncroles(interaction: discord.Interaction):
+    if not await owner_check(interaction): return
+    await interaction.response.defer(ephemeral=True)
+    stats = await reconcile_roles()
+    if stats is None:
+        await interaction.followup.send("⏳ Une réconciliation est déjà en cours", ephemeral=True); return
+    await interaction.followup.send(
+        f"✅ Rôle **{CONFIG['ACTIVE_ROLE_NAME']}** : +{stats['added']} / -{stats['removed']}"
+        f" ({stats['failed']} échecs, {stats['api_calls']} appels API, {stats['seconds']:.1f}s)", ephemeral=True)
 
 @tree.command(name="setleader", description="Changer le chef d'un clan (proprio)")
 async def slash_setleader(interaction: discord.Interaction, clan: str, nouveau_chef: str):
@@ -929,8 +3500,10 @@ async def slash_setleader(interaction: discord.Interaction, clan: str, nouveau_c
         await interaction.response.send_message(f"❌ **{nouveau_chef}** est dans un autre clan. Retire-le d'abord.", ephemeral=True); return
     ancien = clans[clan]["leader"]
     clans[clan]["leader"] = nouveau_chef
+    mark_dirty("clans", clan)
     if nouveau_chef not in clan_members:
         clan_members[nouveau_chef] = clan
+        mark_dirty("clan_members", nouveau_chef)
     save_data()
     await interaction.response.send_message(f"✅ Chef de **{clan}** : **{ancien}** → **{nouveau_chef}**", ephemeral=True)
 
@@ -940,13 +3513,15 @@ async def slash_deleteclan(interaction: discord.Interaction, nom: str):
     if nom not in clans:
         await interaction.response.send_message("❌ Ce clan n'existe pas", ephemeral=True); return
     refund = 0
-    for target, b in list(bounties.items()):
-        if b["proposer_clan"] == nom:
-            refund += b["points"]
-            del bounties[target]
-    removed=[p for p,c in clan_members.items() if c==nom]
+    for target, b in bounties_of(nom):
+        refund += b["points"]
+        del bounties[target]
+        mark_dirty("bounties", target)
+    removed=members_of(nom)
     for m in removed: del clan_members[m]
+    mark_dirty("clan_members", *removed)
     del clans[nom]
+    mark_dirty("clans", nom)
     save_data()
     msg = f"✅ **{nom}** supprimé ({len(removed)} membres retirés)"
     if refund: msg += f"\n💰 {refund} pts de primes annulées (perdus car le clan n'existe plus)"
@@ -960,6 +3535,7 @@ async def slash_addtoclan(interaction: discord.Interaction, joueur: str, clan: s
     if joueur in clan_members:
         await interaction.response.send_message(f"❌ **{joueur}** est déjà dans **{clan_members[joueur]}**", ephemeral=True); return
     clan_members[joueur] = clan
+    mark_dirty("clan_members", joueur)
     save_data()
     await interaction.response.send_message(f"✅ **{joueur}** ajouté dans **{clan}**", ephemeral=True)
 
@@ -970,9 +3546,12 @@ async def slash_removefromclan(interaction: discord.Interaction, joueur: str):
         await interaction.response.send_message(f"❌ **{joueur}** n'est dans aucun clan", ephemeral=True); return
     cn = clan_members[joueur]
     if clans.get(cn,{}).get("leader") == joueur:
-        others=[p for p,c in clan_members.items() if c==cn and p!=joueur]
-        if others: clans[cn]["leader"] = others[0]
+        others=[p for p in members_of(cn) if p!=joueur]
+        if others:
+            clans[cn]["leader"] = others[0]
+            mark_dirty("clans", cn)
     del clan_members[joueur]
+    mark_dirty("clan_members", joueur)
     save_data()
     await interaction.response.send_message(f"✅ **{joueur}** retiré de **{cn}**", ephemeral=True)
 
@@ -981,11 +3560,10 @@ async def slash_resetstats(interaction: discord.Interaction, joueur: str):
     if not await owner_check(interaction): return
     if joueur not in player_data:
         await interaction.response.send_message(f"❌ Aucune donnée pour **{joueur}**", ephemeral=True); return
-    player_data[joueur] = {
-        "total_minutes":0,"sessions":0,"kills":0,"deaths":0,
-        "zombie_kills":0,"clan_kills":0,"last_seen":None,
-        "first_seen":datetime.now().isoformat(),"achievements":[],"rivals":{}
-    }
+    for o in rivalries.remove_player(player_data[joueur].id):
+        mark_dirty("players", name_table.names[o])
+    player_data[joueur] = PlayerRecord(joueur, first_seen=int(time.time()))
+    mark_dirty("players", joueur)
     save_data()
     await interaction.response.send_message(f"✅ Stats de **{joueur}** remises à zéro", ephemeral=True)
 
@@ -998,10 +3576,12 @@ async def slash_cancelbountyadmin(interaction: discord.Interaction, cible: str,
     msg = f"✅ Prime sur **{cible}** supprimée ({b['points']} pts)"
     if rembourser and b["proposer_clan"] in clans:
         clans[b["proposer_clan"]]["points"] += b["points"]
+        mark_dirty("clans", b["proposer_clan"])
         msg += f" — **{b['points']} pts rendus** à **{b['proposer_clan']}**"
     else:
         msg += " — points **perdus**"
     del bounties[cible]
+    mark_dirty("bounties", cible)
     save_data()
     await interaction.response.send_message(msg, ephemeral=True)
 
@@ -1009,6 +3589,7 @@ async def slash_cancelbountyadmin(interaction: discord.Interaction, cible: str,
 async def slash_setchannel(interaction: discord.Interaction, channel: discord.TextChannel):
     if not await owner_check(interaction): return
     CONFIG["ANNOUNCEMENT_CHANNEL_ID"] = channel.id
+    mark_dirty("config", "ANNOUNCEMENT_CHANNEL_ID")
     save_data()
     await interaction.response.send_message(f"✅ Annonces dans {channel.mention}", ephemeral=True)
     await channel.send("🔔 Ce salon recevra les annonces du serveur Minecraft.")
@@ -1017,24 +3598,82 @@ async def slash_setchannel(interaction: discord.Interaction, channel: discord.Te
 async def slash_setlogschannel(interaction: discord.Interaction, channel: discord.TextChannel):
     if not await owner_check(interaction): return
     CONFIG["LOGS_CHANNEL_ID"] = channel.id
+    mark_dirty("config", "LOGS_CHANNEL_ID")
     save_data()
     await interaction.response.send_message(f"✅ Logs dans {channel.mention}", ephemeral=True)
     await channel.send("📋 Ce salon recevra les connexions/déconnexions.")
 
+# ── AUTOCOMPLÉTION ────────────────────────────
+
+def _choices(names):
+    return [app_commands.Choice(name=n, value=n) for n in names]
+
+async def player_autocomplete(interaction: discord.Interaction, current: str):
+    ranking("recent")   # applique les modifications en attente
+    return _choices(RANKS["player_names"].complete(current))
+
+async def clan_autocomplete(interaction: discord.Interaction, current: str):
+    ranking("clan_points")
+    return _choices(RANKS["clan_names"].complete(current))
+
+async def server_autocomplete(interaction: discord.Interaction, current: str):
+    return _choices([k for k in monitored if k.startswith(current)][:25])
+
+async def config_autocomplete(interaction: discord.Interaction, current: str):
+    cur = current.upper()
+    return _choices([k for k in CONFIG if cur in k][:25])
+
+for _cmd, _params, _handler in (
+    (slash_stats,             ("joueur",),                player_autocomplete),
+    (slash_rank,              ("joueur",),                player_autocomplete),
+    (slash_rivalry,           ("joueur1", "joueur2"),     player_autocomplete),
+    (slash_myrivalry,         ("adversaire",),            player_autocomplete),
+    (slash_bounty,            ("cible",),                 player_autocomplete),
+    (slash_cancelbounty,      ("cible",),                 player_autocomplete),
+    (slash_cancelbountyadmin, ("cible",),                 player_autocomplete),
+    (slash_transferleader,    ("nouveau_chef",),          player_autocomplete),
+    (slash_givekill,          ("killer", "victim"),       player_autocomplete),
+    (slash_addtime,           ("joueur",),                player_autocomplete),
+    (slash_setleader,         ("nouveau_chef",),          player_autocomplete),
+    (slash_addtoclan,         ("joueur",),                player_autocomplete),
+    (slash_removefromclan,    ("joueur",),                player_autocomplete),
+    (slash_resetstats,        ("joueur",),                player_autocomplete),
+    (slash_joinclan,          ("nom",),                   clan_autocomplete),
+    (slash_claninfo,          ("nom",),                   clan_autocomplete),
+    (slash_deleteclan,        ("nom",),                   clan_autocomplete),
+    (slash_renameclan,        ("ancien",),                clan_autocomplete),
+    (slash_setpoints,         ("clan",),                  clan_autocomplete),
+    (slash_addpoints,         ("clan",),                  clan_autocomplete),
+    (slash_setleader,         ("clan",),                  clan_autocomplete),
+    (slash_addtoclan,         ("clan",),                  clan_autocomplete),
+    (slash_status,            ("serveur",),               server_autocomplete),
+    (slash_removeserver,      ("cle",),                   server_autocomplete),
+    (slash_setconfig,         ("cle",),                   config_autocomplete),
+):
+    for _param in _params:
+        _cmd.autocomplete(_param)(_handler)
+
 # ── AIDE ──────────────────────────────────────
 
 @tree.command(name="help", description="Liste de toutes les commandes")
 async def slash_help(interaction: discord.Interaction):
+    # Contenu fixe : construit une seule fois
+    await interaction.response.send_message(embeds=render_cache.get(("help",), (), _render_help))
+
+def _render_help():
     # ── Embed 1 : Stats + Bounties + Clans (max 25 champs) ──
     e1 = discord.Embed(title="📖 Commandes du Bot Minecraft (1/2)", color=discord.Color.blurple())
 
     e1.add_field(name="━━ 🎮 STATS ━━",               value="\u200b", inline=False)
-    e1.add_field(name="/status",                       value="Statut serveur",              inline=True)
+    e1.add_field(name="/status [serveur]",             value="Statut serveur(s)",           inline=True)
+    e1.add_field(name="/servers",                      value="Serveurs surveillés",         inline=True)
     e1.add_field(name="/stats <joueur>",               value="Stats complètes",             inline=True)
     e1.add_field(name="/pvpleaderboard",               value="Top kills PvP",               inline=True)
     e1.add_field(name="/top",                          value="Top temps de jeu",            inline=True)
+    e1.add_field(name="/rank <joueur>",                value="Rang dans chaque classement", inline=True)
     e1.add_field(name="/rivalry <j1> <j2>",            value="Historique entre 2 joueurs",  inline=True)
     e1.add_field(name="/myrivalry <adversaire>",       value="Tes stats vs un joueur",      inline=True)
+    e1.add_field(name="/toprivalries",                 value="Rivalités les plus disputées", inline=True)
 
     e1.add_field(name="━━ 💰 BOUNTIES ━━",             value="\u200b", inline=False)
     e1.add_field(name="/bounty <cible> <pts>",         value="Poser une prime (chef clan)", inline=True)
@@ -1056,6 +3695,9 @@ async def slash_help(interaction: discord.Interaction):
     e2.add_field(name="/setupclan <nom> <chef> <membres>", value="Créer un clan complet d'un coup",  inline=True)
     e2.add_field(name="/config",                       value="Voir la config du bot",        inline=True)
     e2.add_field(name="/setconfig <clé> <valeur>",     value="Modifier la config",           inline=True)
+    e2.add_field(name="/flush",                        value="Forcer la sauvegarde",         inline=True)
+    e2.add_field(name="/addserver <clé> <adresse> <nom>", value="Ajouter/modifier un serveur", inline=True)
+    e2.add_field(name="/removeserver <clé>",           value="Retirer un serveur",           inline=True)
     e2.add_field(name="/listplayers",                  value="Tous les joueurs enregistrés", inline=True)
     e2.add_field(name="/setleader <clan> <chef>",      value="Changer le chef d'un clan",    inline=True)
     e2.add_field(name="/setpoints <clan> <pts>",       value="Définir les points exactement",inline=True)
@@ -1063,7 +3705,8 @@ async def slash_help(interaction: discord.Interaction):
     e2.add_field(name="/renameclan <ancien> <nouveau>",value="Renommer un clan",             inline=True)
     e2.add_field(name="/givekill <killer> <victim>",   value="Enregistrer un kill manuellement",inline=True)
     e2.add_field(name="/addtime <joueur> <min>",       value="Ajouter du temps de jeu",      inline=True)
-    e2.add_field(name="/uploadlogs",                   value="Analyser logs MC (.log/.txt)", inline=True)
+    e2.add_field(name="/syncroles",                    value="Réconcilier le rôle actif",    inline=True)
+    e2.add_field(name="/uploadlogs",                   value="Analyser logs MC (.log/.log.gz/.txt, jusqu'à 10)", inline=True)
     e2.add_field(name="/deleteclan <nom>",             value="Supprimer un clan",            inline=True)
     e2.add_field(name="/addtoclan <j> <clan>",         value="Ajouter dans un clan",         inline=True)
     e2.add_field(name="/removefromclan <j>",           value="Retirer d'un clan",            inline=True)
@@ -1072,7 +3715,10 @@ async def slash_help(interaction: discord.Interaction):
     e2.add_field(name="/setchannel",                   value="Salon des annonces",           inline=True)
     e2.add_field(name="/setlogschannel",               value="Salon des logs",               inline=True)
     e2.set_footer(text="💡 Points bounty : retenus en escrow dès la création | rendus si annulation")
+    return [e1, e2]
 
-    await interaction.response.send_message(embeds=[e1, e2])
-
-bot.run(BOT_TOKEN)
+if __name__ == "__main__":
+    bot.run(BOT_TOKEN)
+    flush_now()  # sauvegarde forcée à l'arrêt
+    if _parse_pool:
+        _parse_pool.shutdown()